@@ -1,3 +1,4 @@
+import argparse
 import json
 import os
 import sys
@@ -5,29 +6,32 @@ import traceback
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-import traceback
-from sqlalchemy import text
-# === Controllers ===
-from src.controller.document_controller import DocumentController
-from src.schemas.weaviate import PRODUCT_SCHEMA, DEFAULT_SCHEMA
-from src.controller.postgres_controller import PostgresController
-from src.utils.structToDB.process_xlsx_xlsm import ExcelDataExtractor
-from src.controller.structured_data_controller import StructuredDataController
-
-# Optional Agentic extractor
-try:
-    from src.controller.agentic_controller import AgenticExtractor
-except ImportError:
-    AgenticExtractor = None
+# Heavy subsystems (docling/torch, pandas, weaviate, SQLAlchemy) are imported
+# on first use through timed_import, so a run only pays for the task types it has.
+from src.utils.import_profiler import timed_import, import_report
+from src.utils.ingest_manifest import DEFAULT_MANIFEST_PATH
+from src.utils.vectorDB.dead_letter import DEFAULT_DEAD_LETTER_PATH
 
 
 # --------------------------------------------
 # CONFIG
 # --------------------------------------------
-SCHEMA_MAP = {
-    "PRODUCT_SCHEMA": PRODUCT_SCHEMA,
-    "DEFAULT_SCHEMA": DEFAULT_SCHEMA
-}
+SCHEMA_NAMES = ("PRODUCT_SCHEMA", "DEFAULT_SCHEMA")
+
+
+def get_schema(name):
+    """Resolve a schema name from tasks_config.json to the schema list."""
+    if name not in SCHEMA_NAMES:
+        return None
+    return getattr(timed_import("src.schemas.weaviate"), name)
+
+
+def get_agentic_extractor():
+    """Optional Agentic extractor; None when agentic-doc is not installed."""
+    try:
+        return timed_import("src.controller.agentic_controller").AgenticExtractor
+    except ImportError:
+        return None
 
 
 # --------------------------------------------
@@ -35,13 +39,22 @@ SCHEMA_MAP = {
 # --------------------------------------------
 class StructuredRunner:
     def __init__(self):
-        self.psql = PostgresController()
-        self.psql.delete_all_collections(confirm=False)
+        self._psql = None
+
+    @property
+    def psql(self):
+        # Created on first use so document-only runs never load SQLAlchemy.
+        if self._psql is None:
+            PostgresController = timed_import("src.controller.postgres_controller").PostgresController
+            self._psql = PostgresController()
+            self._psql.delete_all_collections(confirm=False)
+        return self._psql
     # --------------------------------------------
     # Database Connection Checks
     # --------------------------------------------
     def check_postgres_connection(self) -> bool:
         try:
+            from sqlalchemy import text
             if hasattr(self.psql, "engine"):
                 with self.psql.engine.connect() as conn:
                     conn.execute(text("SELECT 1"))
@@ -63,16 +76,18 @@ class StructuredRunner:
 
     def check_weaviate_connection(self) -> bool:
         try:
-            # Try local or remote based on env
-            weaviate_connection =DocumentController()
-            client = weaviate_connection.weaviate_client.client
-            if client.is_ready():
-                print("✅ Weaviate connection verified.")
-                client.close()
-                return True
-            else:
+            # Plain client ping; no collection setup or document converter is built.
+            # The client is shared, so document tasks reuse this connection.
+            weaviate_controller = timed_import("src.controller.weaviate_controller")
+            client = weaviate_controller.shared_client()
+            try:
+                if client.is_ready():
+                    print("✅ Weaviate connection verified.")
+                    return True
                 print("⚠️ Weaviate client not ready.")
                 return False
+            finally:
+                weaviate_controller.release_client(client)
         except Exception as e:
             print(f"❌ Weaviate connection failed: {e}")
             return False
@@ -82,6 +97,7 @@ class StructuredRunner:
     # Structured Tasks
     # --------------------------------------------
     def sales_activity(self, source_dir, origin="s3_bucket", level="2"):
+        ExcelDataExtractor = timed_import("src.utils.structToDB.process_xlsx_xlsm").ExcelDataExtractor
         extractor = ExcelDataExtractor()
         try:
             file_list = extractor.list_excel_files(source_dir)
@@ -93,6 +109,7 @@ class StructuredRunner:
             traceback.print_exc()
 
     def sales_history(self, source_dir, origin="s3_bucket", level="2"):
+        StructuredDataController = timed_import("src.controller.structured_data_controller").StructuredDataController
         try:
             controller = StructuredDataController(
                 files_dir=[source_dir],
@@ -114,6 +131,7 @@ class StructuredRunner:
             traceback.print_exc()
 
     def business_data(self, source_dir, origin="s3_bucket", level="2"):
+        AgenticExtractor = get_agentic_extractor()
         if not AgenticExtractor:
             print("⚠️ AgenticExtractor not available, skipping business_data.")
             return
@@ -133,6 +151,7 @@ class StructuredRunner:
             traceback.print_exc()
 
     def person_data(self, source_dir, origin="s3_bucket", level="2"):
+        StructuredDataController = timed_import("src.controller.structured_data_controller").StructuredDataController
         try:
             controller = StructuredDataController(
                 files_dir=[source_dir],
@@ -158,19 +177,42 @@ class StructuredRunner:
     # --------------------------------------------
     def run_document_task(self, task):
         print(f"\n=== Running document task: {task['name']} ===")
+        processor = None
         try:
             if task.get("name") == "Product":
                 print("Product task detected, skipping near search.")
                 return
 
+            DocumentController = timed_import("src.controller.document_controller").DocumentController
             processor = DocumentController(
                 dir_path=task.get("dir_path"),
                 level=task.get("level"),
                 collection_name=task.get("collection_name"),
-                properties=SCHEMA_MAP.get(task.get("properties")),
+                properties=get_schema(task.get("properties")),
                 collection_delete=task.get("collection_delete", False),
                 product=task.get("product", False),
-                origin=task.get("origin", None)
+                origin=task.get("origin", None),
+                num_workers=task.get("num_workers", 1),
+                cache_dir=task.get("cache_dir"),
+                stream=task.get("stream", False),
+                batch_size=task.get("batch_size", 200),
+                page_triage=task.get("page_triage", False),
+                metrics_report=task.get("metrics_report"),
+                metrics_port=task.get("metrics_port"),
+                task_timeout=task.get("task_timeout"),
+                max_worker_rss_mb=task.get("max_worker_rss_mb"),
+                chunk_token_budget=task.get("chunk_token_budget"),
+                chunk_token_overlap=task.get("chunk_token_overlap"),
+                chunk_workers=task.get("chunk_workers", 1),
+                incremental=task.get("incremental", False),
+                insert_batch_size=task.get("insert_batch_size", 100),
+                insert_concurrency=task.get("insert_concurrency", 2),
+                embedding_cache_dir=task.get("embedding_cache_dir"),
+                skip_existing=task.get("skip_existing", False),
+                manifest_path=task.get("manifest_path", DEFAULT_MANIFEST_PATH),
+                async_pipeline=task.get("async_pipeline", False),
+                queue_size=task.get("queue_size", 4),
+                follow_links=task.get("follow_links", False),
             )
             processor.run()
 
@@ -178,7 +220,8 @@ class StructuredRunner:
                 filters = None
                 if "filters" in task:
                     f = task["filters"]
-                    filters = DocumentController.Filter.by_property(f["field"]).equal(f["value"])
+                    Filter = timed_import("weaviate.classes.query").Filter
+                    filters = Filter.by_property(f["field"]).equal(f["value"])
                 processor.retrieve_data_by_field(
                     field_list=task["retrieve_fields"],
                     limit=task["retrieve_limit"],
@@ -196,33 +239,107 @@ class StructuredRunner:
         except Exception as e:
             print(f"❌ Error in document task {task['name']}: {e}")
             traceback.print_exc()
+        finally:
+            # Free the task's conversion workers (and their models) and hand the shared client back.
+            if processor is not None:
+                processor.close()
 
 
 # --------------------------------------------
 # MAIN EXECUTION
 # --------------------------------------------
-if __name__ == "__main__":
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run ETL tasks from a task config file.")
+    parser.add_argument("--config", default="tasks_config.json", help="Path to the task list (JSON).")
+    parser.add_argument("--type", choices=["document", "structured"], help="Only run tasks of this type.")
+    parser.add_argument("--task", action="append", help="Only run the named task (repeatable).")
+    parser.add_argument("--check-only", action="store_true", help="Check database connections and exit.")
+    parser.add_argument("--import-report", action="store_true", help="Print per-module import cost at exit.")
+    parser.add_argument("--replay-dead-letters", action="store_true",
+                        help="Re-send objects that failed to insert, then exit.")
+    parser.add_argument("--dead-letter-path", default=DEFAULT_DEAD_LETTER_PATH, help="Dead-letter store to replay.")
+    parser.add_argument("--migrate-link-properties", action="store_true",
+                        help="Add the neighbour-link properties to the --collection collections, then exit.")
+    parser.add_argument("--collection", action="append",
+                        help="Collection to replay / migrate (repeatable; replay defaults to all).")
+    return parser.parse_args(argv)
+
+
+def replay_dead_letters(path, collections=None):
+    dead_letter = timed_import("src.utils.vectorDB.dead_letter")
+    store = dead_letter.DeadLetterStore(path)
+    print(f"🔁 {store.count()} dead-lettered objects in {path}")
+    if not store.count():
+        return
+    weaviate_controller = timed_import("src.controller.weaviate_controller")
+    client = weaviate_controller.shared_client()
     try:
-        with open("tasks_config.json", "r", encoding="utf-8") as f:
+        dead_letter.replay_dead_letters(client, store, collections=collections)
+    finally:
+        weaviate_controller.release_client(client)
+        store.close()
+
+
+def migrate_link_properties(collections):
+    weaviate_controller = timed_import("src.controller.weaviate_controller")
+    client = weaviate_controller.shared_client()
+    try:
+        for name in collections:
+            added = weaviate_controller.add_link_properties(client.collections.get(name))
+            print(f"✅ {name}: added {added}" if added else f"✅ {name}: link properties already present")
+    finally:
+        weaviate_controller.release_client(client)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay_dead_letters:
+        replay_dead_letters(args.dead_letter_path, args.collection)
+        return
+    if args.migrate_link_properties:
+        if not args.collection:
+            print("❌ --migrate-link-properties needs at least one --collection.")
+            sys.exit(1)
+        migrate_link_properties(args.collection)
+        return
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
             tasks = json.load(f)
     except Exception as e:
-        print(f"❌ Failed to load tasks_config.json: {e}")
+        print(f"❌ Failed to load {args.config}: {e}")
         sys.exit(1)
 
+    if args.type:
+        tasks = [task for task in tasks if task.get("type") == args.type]
+    if args.task:
+        tasks = [task for task in tasks if task.get("name") in args.task]
+    task_types = {task.get("type") for task in tasks}
+
+    try:
+        run_tasks(tasks, task_types, check_only=args.check_only)
+    finally:
+        if args.import_report:
+            print(import_report())
+
+
+def run_tasks(tasks, task_types, check_only=False):
     structured_runner = StructuredRunner()
 
 
-    # ✅ Run DB checks before processing
-    pg_ok = structured_runner.check_postgres_connection()
-    wv_ok = structured_runner.check_weaviate_connection()
+    # ✅ Run DB checks before processing (only for the databases the task list needs)
+    pg_ok = structured_runner.check_postgres_connection() if "structured" in task_types or check_only else False
+    wv_ok = structured_runner.check_weaviate_connection() if "document" in task_types or check_only else False
+
+    if check_only:
+        return
 
     if not pg_ok and not wv_ok:
         print("❌ No database connections available. Aborting all tasks.")
         exit(1)
 
-    if not pg_ok:
+    if not pg_ok and "structured" in task_types:
         print("⚠️ PostgreSQL connection failed. Structured data tasks will be skipped.")
-    if not wv_ok:
+    if not wv_ok and "document" in task_types:
         print("⚠️ Weaviate connection failed. Document tasks will be skipped.")
 
     # ✅ Continue only for available databases
@@ -261,3 +378,7 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"❌ Error executing task '{task_name}': {e}")
             traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
+import os
 import time
+from collections import deque
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 import pandas as pd
-from src.utils.logger import setup_logger
+from src.utils.logger_config import setup_logger
 from docling.datamodel.accelerator_options import AcceleratorDevice, AcceleratorOptions
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.datamodel.base_models import InputFormat
@@ -13,46 +17,107 @@ from docling.document_converter import (
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.pipeline.simple_pipeline import SimplePipeline
 from docling.pipeline.standard_pdf_pipeline import StandardPdfPipeline
-from docling_core.transforms.serializer.markdown import MarkdownDocSerializer
-from src.utils.extractor.docling_utils import saving_file
+from src.utils.extractor.docling_utils import ConvertedDocument, convert_path, merge_stages
+from src.utils.extractor.artifact_writer import ArtifactWriter
+from src.utils.extractor.chunking_pool import ChunkingPool
+from src.utils.extractor.conversion_pool import ConversionPool
+from src.utils.extractor.supervised_pool import SupervisedConversionPool
+from src.utils.extractor.conversion_cache import ConversionCache
+from src.utils.extractor.pdf_sharding import count_pdf_pages, page_ranges, stitch_shards
+from src.utils.extractor.text_loader import is_fast_path, read_text_document
+from src.utils.extractor.page_triage import TRIAGE_PROFILES, PageTriageReport, convert_triaged
 from src.utils.chunker import TextChunker
-import re
+from src.utils.pipeline_metrics import PipelineMetrics
 
 
 import PIL.Image
 from PIL import Image
 PIL.Image.MAX_IMAGE_PIXELS = None
 Image.MAX_IMAGE_PIXELS = None
-def clean_text(text: str) -> str:
-    # Remove <!-- image -->
-    text = re.sub(r'<!--\s*image\s*-->', '', text)
-    # Remove multiple newlines -> replace with single newline
-    text = re.sub(r'\n+', '\n', text).strip()
-    return text
+
+
+# Pipeline options that change the converted output; also part of the conversion cache key.
+CONVERTER_OPTIONS = {
+    "do_ocr": False,
+    "do_table_structure": True,
+    "do_cell_matching": True,
+    "ocr_lang": ["ja", "en"],
+    "do_formula_enrichment": False,
+    "force_backend_text": False,
+    "images_scale": 2,
+    "do_picture_classification": False,
+}
+
+
+def _docling_version() -> str:
+    try:
+        return version("docling")
+    except PackageNotFoundError:
+        return "unknown"
+
 
 class DoclingController:
-    def __init__(self):
-        """ Initialize the DoclingConverter with optional Weaviate client and StructuredToSQL instance. """
+    def __init__(self, num_workers: int = 1, cache_dir=None, cache_max_mb: int = 1024, fast_path: bool = True,
+                 page_triage: bool = False, task_timeout: float = None, max_worker_rss_mb: int = None,
+                 artifact_compression=None, chunker=None, chunk_workers: int = 1):
+        """
+        Initialize the DoclingConverter.
+        :param num_workers: Number of conversion processes; 1 converts sequentially in this process.
+        :param cache_dir: Directory of the conversion cache; None disables caching.
+        :param cache_max_mb: Size bound of the conversion cache.
+        :param fast_path: Read .txt/.md/.csv directly instead of converting them with Docling.
+        :param page_triage: Classify PDF pages first and run the table model only on table-bearing pages.
+        :param task_timeout: Per-file wall-clock limit in seconds; enables supervised workers.
+        :param max_worker_rss_mb: Per-worker memory ceiling; enables supervised workers.
+        :param artifact_compression: Compress saved artifacts with "gzip" or "zstd".
+        :param chunker: Object with TextChunker's split_texts (e.g. FastTextChunker); default TextChunker(400, 50).
+        :param chunk_workers: Number of processes for cleaning and chunking; 1 chunks in this process.
+        """
         
         self.logger = setup_logger("etl_app")
+        self.num_workers = max(1, num_workers)
+        self.task_timeout = task_timeout
+        self.max_worker_rss_mb = max_worker_rss_mb
+        # Supervised mode always converts in (killable) worker processes, even with one worker.
+        self.supervised = bool(task_timeout or max_worker_rss_mb)
+        self.failed_files = []
+        self.fast_path = fast_path
+        self.page_triage = page_triage
+        self.triage_report = PageTriageReport()
+        self.metrics = PipelineMetrics()
+        self.converter_options = dict(CONVERTER_OPTIONS, page_triage=page_triage)
         self.doc_converter = self._build_converter()
-        self.chunker = TextChunker( chunk_size=400, chunk_overlap=50)
-        
-    def _build_converter(self) -> DocumentConverter:
+        self._converters = {"default": self.doc_converter}
+        self.chunker = chunker or TextChunker( chunk_size=400, chunk_overlap=50)
+        self.chunk_workers = max(1, chunk_workers)
+        self._chunk_pool = None
+        self._pool = None
+        self.artifact_writer = ArtifactWriter(compression=artifact_compression)
+        self.cache = None
+        if cache_dir:
+            self.cache = ConversionCache(
+                cache_dir,
+                options={**self.converter_options, "docling": _docling_version()},
+                max_bytes=cache_max_mb * 1024 * 1024,
+            )
+
+    @staticmethod
+    def _build_converter(num_threads: int = 8, **overrides) -> DocumentConverter:
+        options = {**CONVERTER_OPTIONS, **overrides}
         pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = False
-        pipeline_options.do_table_structure = True
-        pipeline_options.table_structure_options.do_cell_matching = True
+        pipeline_options.do_ocr = options["do_ocr"]
+        pipeline_options.do_table_structure = options["do_table_structure"]
+        pipeline_options.table_structure_options.do_cell_matching = options["do_cell_matching"]
         pipeline_options.do_picture_description = False
-        pipeline_options.ocr_options.lang = ["ja", "en"]
-        pipeline_options.do_formula_enrichment = False
-        pipeline_options.force_backend_text = False
+        pipeline_options.ocr_options.lang = options["ocr_lang"]
+        pipeline_options.do_formula_enrichment = options["do_formula_enrichment"]
+        pipeline_options.force_backend_text = options["force_backend_text"]
         pipeline_options.generate_picture_images = False
-        pipeline_options.images_scale = 2
-        pipeline_options.do_picture_classification = False
+        pipeline_options.images_scale = options["images_scale"]
+        pipeline_options.do_picture_classification = options["do_picture_classification"]
         pipeline_options.do_picture_description
         pipeline_options.accelerator_options = AcceleratorOptions(
-            num_threads=8, device=AcceleratorDevice.AUTO
+            num_threads=num_threads, device=AcceleratorDevice.AUTO
         )
 
         return DocumentConverter(
@@ -82,6 +147,199 @@ class DoclingController:
             },
         )
 
+    @property
+    def _use_pool(self) -> bool:
+        return self.num_workers > 1 or self.supervised
+
+    def _get_pool(self):
+        """Start the worker pool on first use; workers keep their converter across calls."""
+        if self._pool is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.num_workers)
+            build_converter = partial(self._build_converter, num_threads=threads_per_worker)
+            if self.supervised:
+                self._pool = SupervisedConversionPool(
+                    build_converter=build_converter,
+                    num_workers=self.num_workers,
+                    timeout=self.task_timeout,
+                    max_rss_mb=self.max_worker_rss_mb,
+                )
+            else:
+                self._pool = ConversionPool(build_converter=build_converter, num_workers=self.num_workers)
+        return self._pool
+
+    def close(self):
+        """Shut down the conversion and chunking worker pools, if any, and finish pending artifact writes."""
+        self.artifact_writer.close()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._chunk_pool is not None:
+            self._chunk_pool.close()
+            self._chunk_pool = None
+
+    def _convert_documents(self, input_paths, keep_document=False):
+        """
+        Yield a ConvertedDocument per input path, in input order.
+        Plain text formats are read directly and unchanged files are served from the cache;
+        only the remaining files go through the Docling converter.
+        """
+        # Cached entries hold Markdown only, so exports that need the DoclingDocument bypass the cache.
+        use_cache = self.cache is not None and not keep_document
+        # Routes are decided lazily as the converter pulls work, so the first
+        # document is yielded without scanning the whole input list first.
+        records, ready = deque(), deque()
+
+        def to_convert():
+            for path in input_paths:
+                if self.fast_path and is_fast_path(path):
+                    records.append((path, "text", None))
+                    continue
+                key = self.cache.key(path) if use_cache else None
+                hit = use_cache and self.cache.contains(key)
+                records.append((path, "cached" if hit else "convert", key))
+                if not hit:
+                    yield path
+
+        converted = self._convert_uncached(to_convert(), keep_document)
+        while True:
+            if not records:
+                try:
+                    ready.append(next(converted))
+                except StopIteration:
+                    pass
+                if not records:
+                    break
+            path, route, key = records.popleft()
+            if route == "text":
+                yield read_text_document(path)
+                continue
+            if route == "cached":
+                text = self.cache.get(key)
+                if text is not None:
+                    yield ConvertedDocument(source=str(path), text=text)
+                    continue
+                # Evicted since the lookup; convert inline to keep input order.
+                res = next(self._convert_uncached([path], keep_document))
+            else:
+                if use_cache:
+                    self.cache.record_miss()
+                res = ready.popleft() if ready else next(converted)
+            if use_cache and not res.error:
+                self.cache.put(key, res.text)
+            yield res
+        if use_cache:
+            self.logger.info(f"Conversion cache: {self.cache.stats()}")
+        self.log_triage()
+
+    def _get_converter(self, profile="default") -> DocumentConverter:
+        """Converter for a TRIAGE_PROFILES key, built on first use."""
+        overrides = TRIAGE_PROFILES.get(profile)
+        if not overrides:
+            return self.doc_converter
+        if profile not in self._converters:
+            self._converters[profile] = self._build_converter(**overrides)
+        return self._converters[profile]
+
+    def _use_triage(self, path) -> bool:
+        return self.page_triage and str(path).lower().endswith(".pdf")
+
+    def _convert_uncached(self, input_paths, keep_document=False):
+        # Triage stitches per-page Markdown without a single DoclingDocument, so it is off for exports.
+        triage = None if keep_document else self._use_triage
+        if self._use_pool:
+            converted = self._get_pool().imap(input_paths, keep_document=keep_document, triage=triage)
+        else:
+            converted = (
+                convert_triaged(self._get_converter, source) if triage and triage(source)
+                else convert_path(self.doc_converter, source)
+                for source in input_paths
+            )
+        for res in converted:
+            if res.triage:
+                self.triage_report.add(res.triage)
+            if res.error:
+                self.failed_files.append((res.source, res.error))
+            yield res
+
+    def convert_sharded(self, file_path, pages_per_shard: int = 20) -> ConvertedDocument:
+        """
+        Convert a large PDF as independent page ranges and stitch the Markdown back together.
+        Each worker only holds one shard, and chunking the stitched text keeps chunk_index contiguous.
+        """
+        try:
+            ranges = page_ranges(count_pdf_pages(file_path), pages_per_shard)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.failed_files.append((str(file_path), error))
+            return ConvertedDocument(source=str(file_path), error=error)
+        self.logger.info(f"Converting {file_path} as {len(ranges)} page-range shards")
+        if self._use_pool:
+            shards = self._get_pool().imap_page_ranges(file_path, ranges)
+        else:
+            shards = (
+                convert_path(self.doc_converter, file_path, keep_document=False, page_range=page_range)
+                for page_range in ranges
+            )
+        texts, stages = [], []
+        for page_range, shard in zip(ranges, shards):
+            if shard.error:
+                # A missing shard would leave a gap in chunk_index, so fail the whole document.
+                error = f"pages {page_range[0]}-{page_range[1]}: {shard.error}"
+                self.failed_files.append((str(file_path), error))
+                return ConvertedDocument(source=str(file_path), error=error)
+            texts.append(shard.text)
+            stages.append(shard.stages)
+        return ConvertedDocument(source=str(file_path), text=stitch_shards(texts), stages=merge_stages(stages))
+
+    def _get_chunk_pool(self) -> ChunkingPool:
+        if self._chunk_pool is None:
+            self._chunk_pool = ChunkingPool(self.chunker, num_workers=self.chunk_workers)
+        return self._chunk_pool
+
+    def _chunk_documents(self, conv_results):
+        """
+        Clean and split converted documents (across chunk_workers processes), in input order.
+        Yields (res, ChunkedText); failed conversions are passed through with None.
+        """
+        for res, chunked in self._get_chunk_pool().imap(conv_results):
+            self.metrics.record_stages(res.source, res.stages)
+            if chunked is not None:
+                self.metrics.record_stages(res.source, chunked.stages)
+            yield res, chunked
+
+    def log_chunking(self):
+        """Log chunks/sec for the documents chunked since the last call and add it to the run metrics."""
+        stats = self._get_chunk_pool().pop_stats()
+        if not stats["documents"]:
+            return
+        # Worker-side clean_text + split_texts time, not the (possibly near-zero) time spent waiting on it.
+        self.metrics.record_batch("chunking", stats["clean_seconds"] + stats["split_seconds"], stats["chunks"])
+        self.logger.info(f"Chunking: {stats}")
+
+    def iter_chunked(self, input_paths):
+        """
+        Stream (ConvertedDocument, ChunkedText) per input path, in input order: converted (through the
+        cache, fast path and conversion pool) and chunked across chunk_workers processes, so chunking
+        one document overlaps with converting the next. Failed conversions come with None.
+        """
+        yield from self._chunk_documents(self._convert_documents(input_paths))
+        self.log_chunking()
+
+    def iter_chunks(self, input_paths):
+        """
+        Stream (source, chunk_index, text) records, converting and chunking one document at a time.
+        """
+        for res, chunked in self.iter_chunked(input_paths):
+            if res.error:
+                self.logger.error(f"❌ Skipping {res.source} due to error: {res.error}")
+                continue
+            self.logger.info(f"✅ Document converted: {res.name}")
+            if not chunked.chunks:
+                self.logger.warning(f"No text extracted from {res.name}, skipping.")
+                continue
+            for index, text in zip(chunked.chunk_index, chunked.chunks):
+                yield res.source, index, text
+
     def process(
         self,
         input_paths,
@@ -92,32 +350,29 @@ class DoclingController:
         start_time = time.time()
         print("Total file found :",len(input_paths))
         print(input_paths)
-        conv_results = self.doc_converter.convert_all(input_paths)
+        keep_document = table_extraction or len(save_format_list) > 0
+        conv_results = self._convert_documents(input_paths, keep_document=keep_document)
         contents,chunk_indexes, sources = [],[],[]
-        for i,res in enumerate(conv_results):
+        for i,(res, chunked) in enumerate(self._chunk_documents(conv_results)):
             print(input_paths[i])
-            if table_extraction:
+            if res.error:
+                self.logger.error(f"❌ Skipping {res.source} due to error: {res.error}")
+                continue
+            if table_extraction and res.document is not None:
                 self.table_extraction(res,output_dir)
-            self.logger.info(f"✅ Document converted: {res.input.file.name}")
-            self.logger.debug(res.document._export_to_indented_text(max_text_len=16))
-            serializer = MarkdownDocSerializer(doc=res.document)
-            ser_result = serializer.serialize()
-            ser_text = clean_text(ser_result.text)
-
-            text_chunks,chunk_index = self.chunker.split_texts(ser_text)
+            self.logger.info(f"✅ Document converted: {res.name}")
+            if res.document is not None:
+                self.logger.debug(res.document._export_to_indented_text(max_text_len=16))
+            ser_text, text_chunks, chunk_index = chunked.text, chunked.chunks, chunked.chunk_index
             if not text_chunks:
-                self.logger.warning(f"No text extracted from {res.input.file.name}, skipping.")
+                self.logger.warning(f"No text extracted from {res.name}, skipping.")
                 continue
             
             contents.extend(text_chunks)
             chunk_indexes.extend(chunk_index)
             sources.extend([input_paths[i]]* len(text_chunks))
-            if len(save_format_list) > 0:
-                saving_file(
-                    res=res,
-                    output_dir=output_dir,
-                    save_format_list=save_format_list,
-                    table_extraction=table_extraction)
+            if len(save_format_list) > 0 and res.document is not None:
+                self.artifact_writer.submit(res, output_dir, save_format_list, table_extraction)
             if i<5:
                 print("document number: ",i)
                 print("Full Text :", ser_text)
@@ -125,6 +380,9 @@ class DoclingController:
                 print("*" * 20)
             # else:
             #     break
+        self.artifact_writer.flush()
+        self.log_chunking()
+        self.log_failures()
         self.logger.info(f"Total time taken: {time.time() - start_time:.2f} seconds")
         return contents,chunk_indexes, sources
     def process_product_spec(
@@ -133,62 +391,85 @@ class DoclingController:
         output_dir=Path("scratch"),
         table_extraction=False,
         save_format_list=[],#,".md", ".txt", ".yaml", ".json"
+        shard_paths=(),
+        pages_per_shard=20,
     ):
+        """
+        Convert and chunk files one by one.
+        :param shard_paths: Large PDFs to convert as page-range shards (see convert_sharded).
+        """
         start_time = time.time()
         contents, sources, chunk_indexes = [], [], []
-        i=0
-        for file_path in input_paths:
-            # file_path = 
-            # skip dot-underscore / hidden files
-            if Path(file_path).name.startswith("._"):
-                print(f"⚠️ Skipping macOS metadata file: {file_path}")
+        file_paths = deque()
+
+        def converted():
+            for file_path in input_paths:
+                # file_path = 
+                # skip dot-underscore / hidden files
+                if Path(file_path).name.startswith("._"):
+                    print(f"⚠️ Skipping macOS metadata file: {file_path}")
+                    continue
+                file_paths.append(file_path)
+                if file_path in shard_paths:
+                    yield self.convert_sharded(file_path, pages_per_shard=pages_per_shard)
+                else:
+                    # Failures (and, in supervised mode, timeouts / memory breaches) come back as res.error.
+                    yield from self._convert_uncached([file_path], keep_document=len(save_format_list) > 0)
+
+        # Chunking of one file overlaps with converting the next when chunk_workers > 1.
+        for i, (res, chunked) in enumerate(self._chunk_documents(converted()), start=1):
+            file_path = file_paths.popleft()
+            if res.error:
+                self.logger.error(f"❌ Skipping {file_path} due to error: {res.error}")
                 continue
-            try:
-                conv_results = self.doc_converter.convert_all([file_path])
-            except Exception as e:
-                self.logger.error(f"❌ Skipping {file_path} due to error: {e}")
-                continue  # skip just this file
-            i+=1
-            for res in conv_results:
-                self.logger.info(f"✅ Document converted: {res.input.file.name}")
-                serializer = MarkdownDocSerializer(doc=res.document)
-                ser_result = serializer.serialize()
-                ser_text = clean_text(ser_result.text)
-                text_chunks,chunk_index = self.chunker.split_texts(ser_text)
-
-                contents.extend(text_chunks)
-                chunk_indexes.extend(chunk_index)
-                sources.extend([file_path] * len(text_chunks))
-
-                if len(save_format_list) > 0:
-                    saving_file(
-                        res=res,
-                        output_dir=output_dir,
-                        save_format_list=save_format_list,
-                        
-                        table_extraction=table_extraction)
-                if i<5:
-                    print("document number: ",i)
-                    print("Full Text :", ser_text)
-                    print("\n\nchunk size :", len(text_chunks))
-                    print("*" * 20)
+            self.logger.info(f"✅ Document converted: {res.name}")
+            ser_text, text_chunks, chunk_index = chunked.text, chunked.chunks, chunked.chunk_index
+
+            contents.extend(text_chunks)
+            chunk_indexes.extend(chunk_index)
+            sources.extend([file_path] * len(text_chunks))
+
+            if len(save_format_list) > 0 and res.document is not None:
+                self.artifact_writer.submit(res, output_dir, save_format_list, table_extraction)
+            if i<5:
+                print("document number: ",i)
+                print("Full Text :", ser_text)
+                print("\n\nchunk size :", len(text_chunks))
+                print("*" * 20)
             # if i>5:
             #     break
-                
+
+        self.artifact_writer.flush()
+        self.log_chunking()
+        self.log_triage()
+        self.log_failures()
         self.logger.info(f"Total time taken: {time.time() - start_time:.2f} seconds")
         return contents,chunk_indexes, sources
 
-    def table_extraction(self, res, output_dir):
+    def log_triage(self):
+        """Log how many pages went through / skipped the table model so far, if triage ran."""
+        if self.triage_report.documents:
+            self.logger.info(f"Page triage: {self.triage_report.summary()}")
+
+    def log_failures(self):
+        """Log the files that failed conversion in this controller, with the reason."""
+        if not self.failed_files:
+            return
+        self.logger.warning(f"{len(self.failed_files)} file(s) failed conversion:")
+        for source, error in self.failed_files:
+            self.logger.warning(f"   {source}: {error}")
+
+    def table_extraction(self, res: ConvertedDocument, output_dir):
         """
         Extract tables from a document and save them as CSV files.
         """
-        stem = res.input.file.stem
+        stem = res.stem
         for table_ix, table in enumerate(res.document.tables):
             table_df: pd.DataFrame = table.export_to_dataframe()
             print(f"## Table {table_ix}")
             print(table_df.to_markdown())
             if table_df.shape[0]==0 or table_df.shape[1]==0:
-                self.logger.warning(f"Empty table found in {res.input.file.name}, skipping export.")
+                self.logger.warning(f"Empty table found in {res.name}, skipping export.")
                 continue
             
             # Save the table as csv
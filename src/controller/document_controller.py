@@ -1,9 +1,16 @@
-from src.controller.docling_controller import DoclingController
-from src.controller.product_controller import ProductsDataController
-from src.controller.weaviate_controller import WeaviateController
+from src.controller.weaviate_controller import WeaviateController, connect_weaviate_async
 from src.schemas.weaviate import DEFAULT_SCHEMA
+from src.utils.async_pipeline import AsyncIngestPipeline
 from src.utils.file_loader import FileLoader
+from src.utils.ingest_manifest import DEFAULT_MANIFEST_PATH, IngestManifest
+from src.utils.pipeline_metrics import PipelineMetrics, start_metrics_server
+from src.utils.vectorDB.async_ingest import AsyncWeaviateWriter
+from src.utils.vectorDB.dead_letter import DEFAULT_DEAD_LETTER_PATH, DeadLetterStore
+from src.utils.vectorDB.neighbour_links import document_links, with_links
+import asyncio
 import os
+from collections import Counter
+from itertools import groupby
 
 
 class DocumentController:
@@ -20,23 +27,83 @@ class DocumentController:
         collection_delete: bool = False,
         product: bool = False,
         allowed_extensions: list = [".pdf", ".docx", ".txt"],
+        num_workers: int = 1,
+        cache_dir: str = None,
+        stream: bool = False,
+        batch_size: int = 200,
+        page_triage: bool = False,
+        metrics_report: str = None,
+        metrics_port: int = None,
+        task_timeout: float = None,
+        max_worker_rss_mb: int = None,
+        chunker=None,
+        chunk_token_budget: int = None,
+        chunk_token_overlap: int = None,
+        chunk_workers: int = 1,
+        incremental: bool = False,
+        insert_batch_size: int = 100,
+        insert_concurrency: int = 2,
+        dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH,
+        embedding_cache_dir: str = None,
+        embedder=None,
+        skip_existing: bool = False,
+        manifest_path: str = DEFAULT_MANIFEST_PATH,
+        async_pipeline: bool = False,
+        queue_size: int = 4,
+        follow_links: bool = False,
     ):
         # Initialize Weaviate controller
         self.weaviate_client = WeaviateController(
             collection_name=collection_name,
             embedding_provider=embedding,
             properties=properties,
-            collection_delete=collection_delete
+            collection_delete=collection_delete,
+            batch_size=insert_batch_size,
+            concurrent_requests=insert_concurrency,
+            embedding_cache_dir=embedding_cache_dir,
+            embedder=embedder,
+            skip_existing=skip_existing,
+            follow_links=follow_links,
         )
 
         self.level = level
         self.origin = origin
         self.product = product
+        self.num_workers = num_workers
+        self.cache_dir = cache_dir
+        self.stream = stream
+        self.incremental = incremental
+        self.async_pipeline = async_pipeline
+        self.queue_size = queue_size
+        self.insert_concurrency = insert_concurrency
+        self.batch_size = batch_size
+        self.page_triage = page_triage
+        self.task_timeout = task_timeout
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.chunker = chunker
+        self.chunk_workers = chunk_workers
+        if chunker is None and chunk_token_budget:
+            self.chunker = self._token_chunker(chunk_token_budget, chunk_token_overlap)
+        self.metrics_report = metrics_report
+        self.metrics = PipelineMetrics()
+        if metrics_port:
+            start_metrics_server(metrics_port)
         self.processor = None
+        # Per-file ingest state; unchanged files are skipped by every document entry point.
+        self.manifest = IngestManifest(manifest_path) if manifest_path else None
+        if self.manifest is not None and collection_delete:
+            # The collection was just dropped and recreated empty; nothing in it is ingested any more.
+            self.manifest.forget_collection(self.collection_name)
+        # source -> objects of that source the ingestor gave up on in this run
+        self._insert_failures = Counter()
+        if dead_letter_path:
+            # Failed inserts are kept for `main.py --replay-dead-letters` instead of being lost.
+            self.weaviate_client.weaviate_utils.dead_letter = DeadLetterStore(dead_letter_path)
 
         # --- Perform Weaviate Health Check ---
         if not self._check_weaviate_health():
             print("❌ Weaviate health check failed. Aborting document processing.")
+            self.weaviate_client.client_close()
             self.weaviate_client = None
             return
 
@@ -70,6 +137,18 @@ class DocumentController:
             return False
 
 
+    def _token_chunker(self, max_tokens: int, overlap_tokens: int = None):
+        """Chunker budgeted in tokens of the model this collection embeds with."""
+        from src.utils.chunker import TokenTextChunker
+        model = self.weaviate_client.vector_model
+        if self.weaviate_client.embedding_provider != "openai":
+            print(f"⚠️ No tokenizer mapped for {model}; counting tokens with cl100k_base as an approximation.")
+        return TokenTextChunker(
+            max_tokens=max_tokens,
+            overlap_tokens=overlap_tokens if overlap_tokens is not None else max_tokens // 8,
+            model=model,
+        )
+
     # ---------------------------------------------------------------------
     # Your existing logic
     # ---------------------------------------------------------------------
@@ -85,10 +164,24 @@ class DocumentController:
 
         
     def process_document(self):
+        # Imported here so health checks and query-only use never load docling / torch models.
         if self.product:
+            from src.controller.product_controller import ProductsDataController
             self.processor = ProductsDataController()
         else:
-            self.processor = DoclingController()
+            from src.controller.docling_controller import DoclingController
+            self.processor = DoclingController(
+                num_workers=self.num_workers,
+                cache_dir=self.cache_dir,
+                page_triage=self.page_triage,
+                task_timeout=self.task_timeout,
+                max_worker_rss_mb=self.max_worker_rss_mb,
+                chunker=self.chunker,
+                chunk_workers=self.chunk_workers,
+            )
+            # Conversion/chunking and insert stages land in the same run report.
+            self.processor.metrics = self.metrics
+            self.weaviate_client.weaviate_utils.metrics = self.metrics
 
     def insert_product_into_weaviate(self):
         """Process, chunk, and insert data into Weaviate."""
@@ -111,75 +204,236 @@ class DocumentController:
     def insert_into_weaviate(self):
         """Process, chunk, and insert data into Weaviate."""
         print("start to processing....")
+        input_paths = self._files_to_ingest()
         content,chunk_indexes, sources = self.processor.process(
-            input_paths=self.file_loader.load_files()
+            input_paths=input_paths
         )
         level = [self.level]* len(sources)
         origin = [self.origin]* len(sources)
         print(f"Content: {content}", f"\n\nSources: {sources},\n\nConfidential Level: {self.level}")
         print(f"Content length: {len(content)}", f"Sources length: {len(sources)}",f"origin length: {len(origin)}",f"Sources length: {len(level)}")
-        self.weaviate_client.insert_data_from_lists(
+        result = self.weaviate_client.insert_data_from_lists(
             content=content,
             source=sources,
             level=level,
             origin=origin,
             chunk_index=chunk_indexes
         )
+        self._track_insert_failures(result)
+        self._record_ingested(input_paths, Counter(map(str, sources)))
     
         
 
-    def insert_into_weaviate_prod_spec(self, batch_size=30, log_file="processed_files.txt", max_file_size_mb=10):
-        """Process files in batches, skip files >10MB, insert into Weaviate, and log each batch."""
+    def insert_into_weaviate_stream(self, batch_size: int = None):
+        """Convert, chunk and insert documents incrementally, holding at most one batch of chunks."""
+        batch_size = batch_size or self.batch_size
+        print("start to streaming....")
+        input_paths = self._files_to_ingest()
+        batch, total = [], 0
+        counts, finished, recorded = Counter(), [], set()
+        # Neighbour links are computed per document, so a document split across batches keeps them.
+        for record in with_links(self.processor.iter_chunks(input_paths), self.level, self.origin):
+            if counts and record[0] not in counts:
+                # Records arrive document by document: the previous source is complete.
+                finished.append(next(reversed(counts)))
+            counts[record[0]] += 1
+            batch.append(record)
+            if len(batch) >= batch_size:
+                total += self._insert_records(batch)
+                batch = []
+                # Sources whose last chunk is now inserted.
+                self._record_ingested(finished, counts)
+                recorded.update(finished)
+                finished = []
+        if batch:
+            total += self._insert_records(batch)
+        # The remaining sources, plus files that failed or produced no chunks.
+        self._record_ingested([p for p in input_paths if str(p) not in recorded], counts)
+        print(f"✅ Streamed {total} chunks into Weaviate.")
+
+    def insert_into_weaviate_incremental(self):
+        """
+        Re-ingest documents, changing only the chunks that differ from what is stored per source.
+        Holds one document's chunks at a time.
+        """
+        print("start to syncing....")
+        input_paths = self._files_to_ingest()
+        totals, counts = Counter(), Counter()
+        records = self.processor.iter_chunks(input_paths)
+        for source, group in groupby(records, key=lambda record: record[0]):
+            _, chunk_indexes, contents = (list(col) for col in zip(*group))
+            summary = self.weaviate_client.sync_source(
+                source, contents, chunk_indexes, level=self.level, origin=self.origin
+            )
+            totals.update(summary)
+            counts[source] = len(contents)
+            self._insert_failures[source] += summary.get("failed", 0)
+            self._record_ingested([source], counts)
+        self._record_ingested([p for p in input_paths if str(p) not in counts], counts)
+        print(f"✅ Incremental sync done: {dict(totals)}")
+
+    def insert_into_weaviate_async(self):
+        """Convert, chunk and insert through bounded asyncio queues on the async Weaviate client."""
+        print("start to async ingestion....")
+        asyncio.run(self._insert_async())
+
+    async def _insert_async(self):
+        input_paths = self._files_to_ingest()
+        utils = self.weaviate_client.weaviate_utils
+        client = await connect_weaviate_async(self.weaviate_client.embedding_provider)
+        try:
+            writer = AsyncWeaviateWriter(
+                client.collections.get(self.collection_name),
+                level=self.level,
+                origin=self.origin,
+                embedder=utils.embedder,
+                dead_letter=utils.dead_letter,
+                skip_existing=utils.skip_existing,
+                max_retries=utils.ingestor.max_retries,
+                metrics=self.metrics,
+            )
+
+            def annotate(doc, chunked):
+                if utils.links_enabled:
+                    chunked.links = document_links(doc.source, chunked.chunks, chunked.chunk_index, self.level, self.origin)
+                return chunked
+
+            async def load(records):
+                self._track_insert_failures(await writer.insert(records))
+
+            pipeline = AsyncIngestPipeline(
+                # Conversion and chunking (on the processor's chunk_workers pool) in the extract stage.
+                self.processor.iter_chunked(input_paths),
+                load,
+                annotate=annotate,
+                batch_size=self.batch_size,
+                queue_size=self.queue_size,
+                loaders=self.insert_concurrency,
+                on_source_done=lambda source, count: self._record_ingested([source], {source: count}),
+            )
+            queues = await pipeline.run()
+        finally:
+            await client.close()
+        self.metrics.record_queues(queues)
+        print(f"✅ Loaded {pipeline.loaded} chunks into Weaviate. Queues: {queues}")
+
+    def _insert_records(self, records) -> int:
+        """Insert a batch of (source, chunk_index, text, links) records."""
+        sources, chunk_indexes, contents, links = (list(col) for col in zip(*records))
+        # Same property order as insert_into_weaviate, so generated UUIDs match.
+        result = self.weaviate_client.insert_data_from_lists(
+            content=contents,
+            source=sources,
+            level=[self.level] * len(records),
+            origin=[self.origin] * len(records),
+            chunk_index=chunk_indexes,
+            links=links,
+        )
+        self._track_insert_failures(result)
+        return len(records)
+
+    # ---------------------------------------------------------------------
+    # Ingest manifest
+    # ---------------------------------------------------------------------
+    @property
+    def collection_name(self) -> str:
+        return self.weaviate_client.collection_name
+
+    def _files_to_ingest(self, files=None):
+        """Files from the loader (or ``files``) that are new, changed or failed last time."""
+        files = self.file_loader.load_files() if files is None else files
+        if self.manifest is None:
+            return files
+        files = self.manifest.filter_changed(files, self.collection_name)
+        self.manifest.mark_started(files, self.collection_name)
+        return files
+
+    def _track_insert_failures(self, result):
+        for failure in getattr(result, "failures", ()):
+            self._insert_failures[str(failure.properties.get("source"))] += 1
+
+    def _record_ingested(self, files, chunk_counts):
+        """Mark files done with their chunk count and stage timings, or failed with the reason."""
+        if self.manifest is None:
+            return
+        conversion_errors = dict(self.processor.failed_files)
+        failures = []
+        for path in files:
+            source = str(path)
+            if source in conversion_errors:
+                failures.append((path, conversion_errors[source]))
+            elif self._insert_failures[source]:
+                failures.append((path, f"{self._insert_failures[source]} objects failed to insert (dead-lettered)"))
+            else:
+                stages = self.metrics.documents.get(source, {})
+                timings = {stage: values["seconds"] for stage, values in stages.items()}
+                self.manifest.mark_done(path, self.collection_name, chunk_counts.get(source, 0), timings)
+        if failures:
+            self.manifest.mark_failed(failures, self.collection_name)
+
+    def insert_into_weaviate_prod_spec(self, batch_size=30, log_file="processed_files.txt", max_file_size_mb=10,
+                                       large_file_mode="skip", pages_per_shard=20):
+        """
+        Process files in batches, insert into Weaviate, and record each batch in the ingest manifest.
+        Files >max_file_size_mb are skipped, or with large_file_mode="shard" PDFs are
+        converted as page-range shards of pages_per_shard pages.
+        :param log_file: Legacy processed-files log, imported into the manifest once.
+        """
         print("Start processing...")
 
         # Load all files
         all_files = self.file_loader.load_files()
 
-        # Read already processed files from log (if exists)
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                processed_files = set(line.strip() for line in f.readlines())
-        except FileNotFoundError:
-            processed_files = set()
-
-        # Filter out files that are already processed
-        files_to_process = [f for f in all_files if f not in processed_files]
+        # Filter out files that are already processed and unchanged
+        if self.manifest is not None:
+            self.manifest.import_processed_log(log_file, self.collection_name)
+            files_to_process = self.manifest.filter_changed(all_files, self.collection_name)
+        else:
+            files_to_process = all_files
 
         # Filter out files larger than max_file_size_mb
         filtered_files = []
+        shard_files = set()
         for f in files_to_process:
             try:
                 size_mb = os.path.getsize(f) / (1024 * 1024)
                 if size_mb <= max_file_size_mb:
                     filtered_files.append(f)
+                elif large_file_mode == "shard" and f.lower().endswith(".pdf"):
+                    print(f"Sharding large file (> {max_file_size_mb}MB): {f}")
+                    filtered_files.append(f)
+                    shard_files.add(f)
                 else:
                     print(f"Skipping large file (> {max_file_size_mb}MB): {f}")
             except FileNotFoundError:
                 print(f"File not found, skipping: {f}")
 
         total_files = len(filtered_files)
-        print(f"Total files to process (<= {max_file_size_mb}MB): {total_files}")
+        print(f"Total files to process: {total_files} ({len(shard_files)} sharded)")
 
         # Process in batches
         for i in range(0, total_files, batch_size):
             batch_files = filtered_files[i:i + batch_size]
             print(f"\nProcessing batch {i // batch_size + 1}: {batch_files}")
+            if self.manifest is not None:
+                self.manifest.mark_started(batch_files, self.collection_name)
 
             # Process the batch
-            content,chunk_indexes, sources = self.processor.process_product_spec(input_paths=batch_files)
+            content,chunk_indexes, sources = self.processor.process_product_spec(
+                input_paths=batch_files,
+                shard_paths=shard_files,
+                pages_per_shard=pages_per_shard,
+            )
 
-            # Record the batch file names for each content piece
-            source_with_file = []
-            for idx, src in enumerate(sources):
-                file_index = idx % len(batch_files)  # Map content to corresponding file
-                source_with_file.append(f"{batch_files[file_index]}::{src}")
+            # Each chunk keeps the file it came from, so neighbour links stay within one document.
+            source_with_file = [str(src) for src in sources]
 
             # Prepare level and origin
             level_list = [self.level] * len(content)
             origin_list = [self.origin] * len(content)
 
             # Insert into Weaviate
-            self.weaviate_client.insert_data_from_lists(
+            result = self.weaviate_client.insert_data_from_lists(
                 content=content,
                 source=source_with_file,
                 level=level_list,
@@ -187,11 +441,9 @@ class DocumentController:
                 chunk_index=chunk_indexes
             )
 
-            # Log the processed batch immediately
-            with open(log_file, "a", encoding="utf-8") as f_log:
-                for file_path in batch_files:
-                    f_log.write(file_path + "\n")
-                    processed_files.add(file_path)  # Update in-memory set
+            # Record the processed batch immediately
+            self._track_insert_failures(result)
+            self._record_ingested(batch_files, Counter(map(str, sources)))
 
             print(f"Batch {i // batch_size + 1} inserted and logged successfully!")
 
@@ -205,12 +457,39 @@ class DocumentController:
         """Main execution method."""
         if self.product:
             self.insert_product_into_weaviate()
+        elif self.incremental:
+            self.insert_into_weaviate_incremental()
+        elif self.async_pipeline:
+            self.insert_into_weaviate_async()
+        elif self.stream:
+            self.insert_into_weaviate_stream()
         else:
             self.insert_into_weaviate()
+        self.write_metrics_report()
         
     def run_product_spec(self):
         """Main execution method."""
         self.insert_into_weaviate_prod_spec()
+        self.write_metrics_report()
+
+    def close(self):
+        """Shut down the processor's worker pools and hand the shared Weaviate client back."""
+        if self.processor is not None and hasattr(self.processor, "close"):
+            self.processor.close()
+            self.processor = None
+        if self.weaviate_client is not None:
+            self.weaviate_client.client_close()
+            self.weaviate_client = None
+
+    def write_metrics_report(self):
+        """Log per-stage totals and save the JSON run report if metrics_report is set."""
+        print(f"Pipeline stages: {self.metrics.summary()}")
+        if hasattr(self.chunker, "token_stats"):
+            print(f"Chunk tokens: {self.chunker.token_stats()}")
+        if self.manifest is not None:
+            print(f"📒 Manifest ({self.collection_name}): {self.manifest.summary(self.collection_name)}")
+        if self.metrics_report:
+            self.metrics.write_report(self.metrics_report)
 
     def print_collection_info(self):
         """Print information about the Weaviate collection."""
@@ -231,5 +510,5 @@ class DocumentController:
         self.weaviate_client.query_data(query_text=query_text,limit=limit)
 
     def query_data_hybrid(self,query_text,limit=5,index_range=50):
-        self.weaviate_client.query_data_hybrid(query_text=query_text,limit=limit,index_range=index_range)
+        return self.weaviate_client.query_data_hybrid(query_text=query_text,limit=limit,index_range=index_range)
         
@@ -1,9 +1,86 @@
 import os
 import weaviate
 from weaviate.classes.config import Configure, Property
-from src.schemas.weaviate import DEFAULT_SCHEMA
+from src.schemas.weaviate import DEFAULT_SCHEMA, LINK_SCHEMA
+from src.utils.vectorDB.client_registry import CLIENTS
+from src.utils.vectorDB.collection_meta import invalidate_collection_meta
+from src.utils.vectorDB.query_cache import bump_generation
 from src.utils.vectorDB.weaviate_utils import WeaviateUtils
 from weaviate.classes.init import Auth
+
+
+def connection_settings(embedding_provider: str = "openai"):
+    """(host_type, host, headers, auth) for HOST_TYPE and the embedding provider's API key header."""
+    headers = {}
+    weaviate_api_key = os.environ["WEAVIATE_API_KEY"]
+    if embedding_provider == "jina":
+        headers["X-JinaAI-Api-Key"] = os.getenv("JINAAI_API_KEY")
+    elif embedding_provider == "openai":
+        headers["X-OpenAI-Api-Key"] = os.getenv("OPENAI_API_KEY")
+    host_type = os.getenv("HOST_TYPE")
+    host = {"prod": os.getenv("PROD_HOST"), "dev": os.getenv("DEV_HOST")}.get(host_type, "localhost")
+    return host_type, host, headers, Auth.api_key(weaviate_api_key)
+
+
+def connect_weaviate(embedding_provider: str = "openai"):
+    """Open a Weaviate client for HOST_TYPE, without touching any collection."""
+    host_type, host, headers, auth = connection_settings(embedding_provider)
+    if host_type=="local":
+        print("Connecting to local Weaviate instance...")
+        client = weaviate.connect_to_local(headers=headers,auth_credentials=auth)
+    elif host_type in ("prod", "dev"):
+        print(f"Connecting to Weaviate at {host}...")
+        client = weaviate.connect_to_custom(headers=headers, http_host=host,http_port=8080,http_secure=False,grpc_host=host,grpc_port=50051, auth_credentials=auth, skip_init_checks=True,grpc_secure=False,)
+    if client.is_ready():
+        print("Connected to Weaviate")
+    else:
+        print("Connection failed")
+    return client
+
+
+def shared_client(embedding_provider: str = "openai"):
+    """
+    The process-wide client for HOST_TYPE, host, provider and headers (see ClientRegistry).
+    Hand it back with release_client instead of closing it; it is closed at exit.
+    """
+    host_type, host, headers, _ = connection_settings(embedding_provider)
+    key = (host_type, host, embedding_provider, tuple(sorted(headers.items())))
+    return CLIENTS.acquire(key, lambda: connect_weaviate(embedding_provider))
+
+
+def release_client(client):
+    CLIENTS.release(client)
+
+
+async def connect_weaviate_async(embedding_provider: str = "openai"):
+    """Async counterpart of connect_weaviate; returns a connected WeaviateAsyncClient."""
+    host_type, host, headers, auth = connection_settings(embedding_provider)
+    if host_type=="local":
+        print("Connecting (async) to local Weaviate instance...")
+        client = weaviate.use_async_with_local(headers=headers, auth_credentials=auth)
+    elif host_type in ("prod", "dev"):
+        print(f"Connecting (async) to Weaviate at {host}...")
+        client = weaviate.use_async_with_custom(headers=headers, http_host=host,http_port=8080,http_secure=False,grpc_host=host,grpc_port=50051, auth_credentials=auth, skip_init_checks=True,grpc_secure=False,)
+    await client.connect()
+    return client
+
+
+def add_link_properties(collection) -> list:
+    """
+    Migration: add the neighbour-link properties (LINK_SCHEMA) to a collection created before they
+    existed. Collections are never changed on open; run it through `main.py --migrate-link-properties`.
+    Returns the names of the added properties.
+    """
+    stored = {p.name for p in collection.config.get().properties}
+    missing = [prop for prop in LINK_SCHEMA if prop["name"] not in stored]
+    for prop in missing:
+        print(f"Adding property '{prop['name']}' to '{collection.name}'...")
+        collection.config.add_property(Property(**prop))
+    if missing:
+        invalidate_collection_meta(collection.name)
+    return [prop["name"] for prop in missing]
+
+
 class WeaviateController:
     def __init__(
         self,
@@ -12,8 +89,22 @@ class WeaviateController:
         embedding_provider:str="openai",
         embedding_model:str=None,
         tenancy_list:list=None,
-        collection_delete:bool=False
+        collection_delete:bool=False,
+        batch_size:int=100,
+        concurrent_requests:int=2,
+        embedding_cache_dir:str=None,
+        embedder=None,
+        skip_existing:bool=False,
+        follow_links:bool=False,
     ):
+        """
+        :param skip_existing: Check UUIDs in bulk before inserting and drop objects that are already stored.
+        :param follow_links: Expand hybrid-search hits by their neighbour links (see WeaviateUtils).
+        :param embedding_cache_dir: Compute vectors client-side and cache them here by (model, content hash);
+            inserts then send vectors explicitly instead of having Weaviate vectorize.
+        :param embedder: Object with ``model`` and ``embed(texts)`` used in that mode
+            (default: OpenAIEmbedder for the collection's model; FakeEmbedder for offline runs).
+        """
         self.collection_name = collection_name
         self.embedding_provider = embedding_provider.lower()
         self.embedding_model = embedding_model
@@ -22,44 +113,62 @@ class WeaviateController:
         self.tenancy_list = tenancy_list or []
         self.client = self._connect()
         self.collection = self._create_collection()
-        self.weaviate_utils = WeaviateUtils(self.collection)
+        self.weaviate_utils = WeaviateUtils(
+            self.collection,
+            batch_size=batch_size,
+            concurrent_requests=concurrent_requests,
+            skip_existing=skip_existing,
+            follow_links=follow_links,
+        )
+        if not self.weaviate_utils.links_enabled:
+            print(f"⚠️ '{self.collection_name}' has no neighbour-link properties; links are not written until "
+                  f"`python main.py --migrate-link-properties --collection {self.collection_name}` is run.")
+        if embedding_cache_dir:
+            self.weaviate_utils.embedder = self._cached_embedder(embedding_cache_dir, embedder)
 
 
     def _connect(self):
-        headers = {}
-        weaviate_api_key = os.environ["WEAVIATE_API_KEY"]
+        return shared_client(self.embedding_provider)
+
+    @property
+    def vector_model(self) -> str:
+        """Embedding model the collection's text_vector is configured with."""
         if self.embedding_provider == "jina":
-            headers["X-JinaAI-Api-Key"] = os.getenv("JINAAI_API_KEY")
-        elif self.embedding_provider == "openai":
-            headers["X-OpenAI-Api-Key"] = os.getenv("OPENAI_API_KEY")
-        if os.getenv("HOST_TYPE")=="local":
-            print("Connecting to local Weaviate instance...")
-            client = weaviate.connect_to_local(headers=headers,auth_credentials=Auth.api_key(weaviate_api_key))
-        elif os.getenv("HOST_TYPE")=="prod":
-            print(f"Connecting to Weaviate at {os.getenv('PROD_HOST')}...")
-            client = weaviate.connect_to_custom(headers=headers, http_host=os.getenv("PROD_HOST"),http_port=8080,http_secure=False,grpc_host=os.getenv("PROD_HOST"),grpc_port=50051, auth_credentials=Auth.api_key(weaviate_api_key), skip_init_checks=True,grpc_secure=False,)
-        elif os.getenv("HOST_TYPE")=="dev":
-            print(f"Connecting to Weaviate at {os.getenv('DEV_HOST')}...")
-            client = weaviate.connect_to_custom(headers=headers, http_host=os.getenv("DEV_HOST"),http_port=8080,http_secure=False,grpc_host=os.getenv("DEV_HOST"),grpc_port=50051, auth_credentials=Auth.api_key(weaviate_api_key), skip_init_checks=True,grpc_secure=False,)
-        if client.is_ready():
-            print("Connected to Weaviate")
-        else:
-            print("Connection failed")
-        return client 
+            return self.embedding_model or "jina-embeddings-v3"
+        return self.embedding_model or "text-embedding-3-small"
+
+    def _cached_embedder(self, cache_dir, embedder=None):
+        from src.utils.vectorDB.embedders import OpenAIEmbedder, vectorizer_input_prefix
+        from src.utils.vectorDB.embedding_cache import CachedEmbedder, EmbeddingCache
+        if embedder is None:
+            if self.embedding_provider != "openai":
+                raise ValueError(f"No client-side embedder for provider {self.embedding_provider}; pass embedder=")
+            embedder = OpenAIEmbedder(model=self.vector_model)
+        # Collections created before vectorize_collection_name=False embed "<collection> content <text>";
+        # client-side vectors get the same input so they agree with server-side ones (e.g. dead-letter replay).
+        prefix = vectorizer_input_prefix(self.weaviate_utils.meta.config())
+        print(f"Client-side embeddings with {embedder.model}, cached in {cache_dir}"
+              + (f" (input prefix {prefix!r})" if prefix else ""))
+        cache = EmbeddingCache(cache_dir, embedder.model, getattr(embedder, "dim", None))
+        return CachedEmbedder(embedder, cache, input_prefix=prefix)
 
     def _vector_config(self):
+        # The server embeds only the source properties' values (no collection name), the same text
+        # client-side embedding sends.
         vectorize_props = [p["name"] for p in self.properties_config if p.get("vectorize_property")]
         if self.embedding_provider == "jina":
             return Configure.Vectors.text2vec_jinaai(
                 name="text_vector",
-                model=self.embedding_model or "jina-embeddings-v3",
+                model=self.vector_model,
                 source_properties=vectorize_props,
+                vectorize_collection_name=False,
             )
         elif self.embedding_provider == "openai":
             return Configure.Vectors.text2vec_openai(
                 name="text_vector",
-                model=self.embedding_model or "text-embedding-3-small",
+                model=self.vector_model,
                 source_properties=vectorize_props,
+                vectorize_collection_name=False,
                 vector_index_config=Configure.VectorIndex.hnsw(
                     vector_cache_max_objects=0
                 )
@@ -70,6 +179,8 @@ class WeaviateController:
         if self.collection_delete:
             print(f"Deleting existing collection '{self.collection_name}'...")
             self.client.collections.delete(self.collection_name)
+            invalidate_collection_meta(self.collection_name)
+            bump_generation(self.collection_name)
 
         if self.collection_name in self.client.collections.list_all():
             print(f"Collection '{self.collection_name}' already exists. Using existing collection.")
@@ -78,21 +189,32 @@ class WeaviateController:
             
 
         print(f"Creating collection '{self.collection_name}'...")
-        properties_list = [Property(**prop) for prop in self.properties_config]
+        # Property names are not vectorized either (see _vector_config).
+        properties_list = [Property(**prop, vectorize_property_name=False) for prop in self.properties_config]
         print("getting the collection")
         collection = self.client.collections.create(
             self.collection_name,
             vector_config=self._vector_config(),
             properties=properties_list
         )
+        invalidate_collection_meta(self.collection_name)
         # collection.config.update(vector_index_config=Reconfigure.VectorIndex.hnsw(vector_cache_max_objects=0))
         if self.tenancy_list:
             collection.tenants.create(self.tenancy_list)
             print(f"Tenant information: {collection.tenants.get()}")
         return collection
 
+    def migrate_link_properties(self) -> list:
+        """Add the neighbour-link properties to this collection (see add_link_properties)."""
+        added = add_link_properties(self.collection)
+        self.weaviate_utils.meta.invalidate()
+        return added
+
     def insert_data_from_lists(self, **kwargs):
-        self.weaviate_utils.insert_data(**kwargs )
+        return self.weaviate_utils.insert_data(**kwargs )
+    def sync_source(self, source, content, chunk_index, level, origin):
+        """Incrementally update one source's chunks (see WeaviateUtils.sync_source)."""
+        return self.weaviate_utils.sync_source(source, content, chunk_index, level, origin)
     def insert_data_from_lists_new(self,  content, source, **kwargs):
         self.weaviate_utils.insert_data_new(content=content, source=source, **kwargs )
         
@@ -101,7 +223,7 @@ class WeaviateController:
         self.weaviate_utils.run_query(query_text, limit)
 
     def query_data_hybrid(self, query_text, limit=5,index_range=50):
-        self.weaviate_utils.run_query_hybrid(query_text, limit,index_range=index_range)
+        return self.weaviate_utils.run_query_hybrid(query_text, limit,index_range=index_range)
     
     def retrieve_data_by_field(self, field_list:list, limit:int=5,fileters=None):
         """Retrieve data using a near_text query."""
@@ -117,11 +239,13 @@ class WeaviateController:
                 uuid=uuid,
                 # properties=kwargs,    
             )
+            bump_generation(self.collection_name)
 
     def show_collection_info(self):
         """Print collection metadata."""
         self.weaviate_utils.print_collection_info(self.collection)
 
     def client_close(self):
-        self.client.close()
+        """Release the shared client; the connection itself is closed at exit."""
+        release_client(self.client)
     
@@ -1,5 +1,12 @@
 from weaviate.classes.config import DataType
 
+# Neighbour links written at ingest (see src/utils/vectorDB/neighbour_links.py).
+LINK_SCHEMA = [
+    {"name": "prev_id", "data_type": DataType.UUID, "vectorize_property": False},
+    {"name": "next_id", "data_type": DataType.UUID, "vectorize_property": False},
+    {"name": "chunk_count", "data_type": DataType.INT, "vectorize_property": False},
+]
+
 PRODUCT_SCHEMA= [
     {"name": "content", "data_type": DataType.TEXT, "vectorize_property": True},
     {"name": "source", "data_type": DataType.TEXT, "vectorize_property": False},
@@ -7,7 +14,8 @@ PRODUCT_SCHEMA= [
     {"name": "youtube_urls", "data_type": DataType.TEXT, "vectorize_property": False},
     {"name": "level", "data_type": DataType.TEXT, "vectorize_property": False},
     {"name": "origin", "data_type": DataType.TEXT, "vectorize_property": False},
-    {"name": "chunk_index", "data_type": DataType.INT, "vectorize_property": False}
+    {"name": "chunk_index", "data_type": DataType.INT, "vectorize_property": False},
+    *LINK_SCHEMA,
 ]
 DEFAULT_SCHEMA = [
     {"name": "content", "data_type": DataType.TEXT, "vectorize_property": True},
@@ -15,7 +23,7 @@ DEFAULT_SCHEMA = [
     {"name": "level", "data_type": DataType.TEXT, "vectorize_property": False},
     {"name": "origin", "data_type": DataType.TEXT, "vectorize_property": False},
     {"name": "chunk_index", "data_type": DataType.INT, "vectorize_property": False},
-
+    *LINK_SCHEMA,
 ]
 DEFAULT_SCHEMA1 = [
     {"name": "content", "data_type": DataType.TEXT, "vectorize_property": True},
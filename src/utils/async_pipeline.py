@@ -0,0 +1,159 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Iterable, List, Tuple
+
+from src.utils.logger_config import logger
+from src.utils.pipeline_metrics import observe_queue_depth
+
+_DONE = object()
+
+
+class QueueDepthMonitor:
+    """Samples the depth of named asyncio queues at a fixed interval."""
+
+    def __init__(self, queues: dict, interval: float = 0.5):
+        self.queues = queues
+        self.interval = interval
+        self.samples = {name: [] for name in queues}
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def sample(self):
+        for name, queue in self.queues.items():
+            depth = queue.qsize()
+            self.samples[name].append(depth)
+            observe_queue_depth(name, depth)
+
+    def summary(self) -> dict:
+        """
+        Per queue: mean / max depth and the share of samples it was full or empty.
+        A queue that is mostly full means its consumer limits throughput; mostly empty, its producer.
+        """
+        summary = {}
+        for name, samples in self.samples.items():
+            capacity = self.queues[name].maxsize
+            n = len(samples) or 1
+            summary[name] = {
+                "capacity": capacity,
+                "mean": round(sum(samples) / n, 2),
+                "max": max(samples, default=0),
+                "full_ratio": round(sum(1 for d in samples if d >= capacity) / n, 3),
+                "empty_ratio": round(sum(1 for d in samples if d == 0) / n, 3),
+            }
+        return summary
+
+
+class AsyncIngestPipeline:
+    """
+    extract -> annotate -> load, connected by bounded asyncio queues.
+
+    ``documents`` is a blocking iterator of (ConvertedDocument, ChunkedText or None) pairs, e.g.
+    DoclingController.iter_chunked, which converts and chunks (on its chunking pool); it is advanced in a
+    worker thread. ``annotate`` runs in a worker thread too; ``load`` is a coroutine taking a list of
+    (source, chunk_index, text, links) records. While one batch is being written the next documents keep
+    converting, and the queue bounds keep memory flat.
+    """
+
+    def __init__(self, documents: Iterable, load: Callable[[List[Tuple]], Awaitable], annotate: Callable = None,
+                 batch_size: int = 200, queue_size: int = 4, loaders: int = 2,
+                 on_source_done: Callable = None, sample_interval: float = 0.5):
+        """
+        :param annotate: Optional (ConvertedDocument, ChunkedText) -> ChunkedText, e.g. to set neighbour links.
+        :param batch_size: Records per load call.
+        :param queue_size: Capacity of each inter-stage queue (documents / batches).
+        :param loaders: Concurrent load calls.
+        :param on_source_done: Called as (source, chunk_count) once all chunks of a source were loaded.
+        """
+        self.documents = documents
+        self.annotate = annotate
+        self.load = load
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.loaders = loaders
+        self.on_source_done = on_source_done
+        self.sample_interval = sample_interval
+        self.chunk_counts = Counter()
+        self._pending = Counter()  # records of a source chunked but not loaded yet
+        self._chunked = set()
+        self.loaded = 0
+
+    def _maybe_done(self, source):
+        if source in self._chunked and not self._pending[source]:
+            self._chunked.discard(source)
+            if self.on_source_done:
+                self.on_source_done(source, self.chunk_counts[source])
+
+    async def _extract(self, documents: asyncio.Queue):
+        iterator = iter(self.documents)
+        while True:
+            doc = await asyncio.to_thread(next, iterator, _DONE)
+            if doc is _DONE:
+                break
+            await documents.put(doc)
+        await documents.put(_DONE)
+
+    async def _chunk(self, documents: asyncio.Queue, batches: asyncio.Queue):
+        batch = []
+        while True:
+            item = await documents.get()
+            if item is _DONE:
+                break
+            doc, chunked = item
+            if doc.error:
+                logger.error(f"❌ Skipping {doc.source} due to error: {doc.error}")
+                self._chunked.add(doc.source)
+                self._maybe_done(doc.source)
+                continue
+            if self.annotate:
+                chunked = await asyncio.to_thread(self.annotate, doc, chunked)
+            links = chunked.links or [None] * len(chunked.chunks)
+            for index, text, link in zip(chunked.chunk_index, chunked.chunks, links):
+                batch.append((doc.source, index, text, link))
+                self._pending[doc.source] += 1
+                if len(batch) >= self.batch_size:
+                    await batches.put(batch)
+                    batch = []
+            self.chunk_counts[doc.source] = len(chunked.chunks)
+            self._chunked.add(doc.source)
+            self._maybe_done(doc.source)
+        if batch:
+            await batches.put(batch)
+        for _ in range(self.loaders):
+            await batches.put(_DONE)
+
+    async def _load(self, batches: asyncio.Queue):
+        while True:
+            batch = await batches.get()
+            if batch is _DONE:
+                break
+            await self.load(batch)
+            self.loaded += len(batch)
+            for source, count in Counter(record[0] for record in batch).items():
+                self._pending[source] -= count
+                self._maybe_done(source)
+
+    async def run(self) -> dict:
+        """Run all stages to completion; returns the queue depth summary."""
+        documents = asyncio.Queue(maxsize=self.queue_size)
+        batches = asyncio.Queue(maxsize=self.queue_size)
+        monitor = QueueDepthMonitor({"documents": documents, "batches": batches}, self.sample_interval)
+        sampler = asyncio.create_task(monitor.run())
+        stages = [
+            asyncio.create_task(self._extract(documents)),
+            asyncio.create_task(self._chunk(documents, batches)),
+            *(asyncio.create_task(self._load(batches)) for _ in range(self.loaders)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # One failed stage would leave the others blocked on a full or empty queue.
+            for stage in stages:
+                stage.cancel()
+            raise
+        finally:
+            sampler.cancel()
+        monitor.sample()
+        return monitor.summary()
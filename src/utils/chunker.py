@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 class TextChunker:
     """Utility class for splitting text into smaller chunks."""
@@ -13,19 +16,198 @@ class TextChunker:
         """Splits texts into smaller chunks."""
         if not texts:
             return [], []
-        
+
         # Ensure texts is a list of strings
         if isinstance(texts, str):
             texts = [texts]
-        
+
         split_text_list = []
         chunk_index = []
         for i,text in enumerate(texts):
-            split_text_list.extend(self.text_splitter.split_text(text))
-            num_chunks = len(self.text_splitter.split_text(text))
-            chunk_index.extend([j for j in range(num_chunks)])
-            
-        
+            chunks = self.text_splitter.split_text(text)
+            split_text_list.extend(chunks)
+            chunk_index.extend(range(len(chunks)))
+
+
         return split_text_list,chunk_index
 
 
+# Paragraph, line, Japanese sentence/clause boundaries, then words and characters.
+JAPANESE_SEPARATORS = ["\n\n", "\n", "。", "！", "？", "、", " ", ""]
+
+
+@dataclass
+class Chunk:
+    """A chunk of a source text with its position; text == source[start:end]."""
+    text: str
+    index: int
+    start: int
+    end: int
+
+
+class FastTextChunker:
+    """
+    Single-pass recursive splitter that tracks character offsets.
+
+    Splits on the first separator present in an oversized segment and recurses with
+    the finer separators, keeping each separator at the end of the piece it closes
+    (so 。！？ stay with their sentence). Pieces are then merged into chunks of at most
+    ``chunk_size`` (as measured by ``length_function``) with up to ``chunk_overlap`` of overlap.
+    Drop-in for TextChunker.split_texts.
+    """
+
+    def __init__(self, chunk_size=400, chunk_overlap=50, separators: Optional[List[str]] = None,
+                 length_function: Callable[[str], int] = len):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or JAPANESE_SEPARATORS
+        self.length_function = length_function
+
+    def _measure(self, text: str):
+        if self.length_function is len:
+            return lambda start, end: end - start
+        return lambda start, end: self.length_function(text[start:end])
+
+    def _spans(self, text, start, end, separators, measure):
+        """Cover text[start:end] with contiguous spans no longer than chunk_size where possible."""
+        if measure(start, end) <= self.chunk_size:
+            return [(start, end)]
+        for i, sep in enumerate(separators):
+            if sep == "" or text.find(sep, start, end) != -1:
+                break
+        else:
+            return [(start, end)]
+        if sep == "":
+            return [(k, k + 1) for k in range(start, end)]
+        finer = separators[i + 1:]
+        spans = []
+        pos = start
+        while pos < end:
+            found = text.find(sep, pos, end)
+            piece_end = end if found == -1 else found + len(sep)
+            if measure(pos, piece_end) <= self.chunk_size:
+                spans.append((pos, piece_end))
+            else:
+                spans.extend(self._spans(text, pos, piece_end, finer, measure))
+            pos = piece_end
+        return spans
+
+    def split_with_offsets(self, text: str) -> List[Chunk]:
+        """Split one text into Chunk(text, index, start, end) records."""
+        if not text:
+            return []
+        measure = self._measure(text)
+        chunks = []
+
+        def emit(window):
+            start, end = window[0][0], window[-1][1]
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end and (not chunks or (chunks[-1].start, chunks[-1].end) != (start, end)):
+                chunks.append(Chunk(text[start:end], len(chunks), start, end))
+
+        window, lengths, total = [], [], 0
+        for span in self._spans(text, 0, len(text), self.separators, measure):
+            length = measure(*span)
+            if window and total + length > self.chunk_size:
+                emit(window)
+                # Keep a tail of at most chunk_overlap as the start of the next chunk.
+                while window and (total > self.chunk_overlap or total + length > self.chunk_size):
+                    total -= lengths.pop(0)
+                    window.pop(0)
+            window.append(span)
+            lengths.append(length)
+            total += length
+        if window:
+            emit(window)
+        return chunks
+
+    def split_batch(self, texts: List[str]) -> List[List[Chunk]]:
+        """Split several documents in one call; chunk indexes restart at 0 per document."""
+        return [self.split_with_offsets(text) for text in texts]
+
+    def split_texts(self, texts):
+        """TextChunker-compatible: (chunk texts, per-document chunk indexes)."""
+        if not texts:
+            return [], []
+        if isinstance(texts, str):
+            texts = [texts]
+        split_text_list, chunk_index = [], []
+        for chunks in self.split_batch(texts):
+            split_text_list.extend(chunk.text for chunk in chunks)
+            chunk_index.extend(chunk.index for chunk in chunks)
+        return split_text_list, chunk_index
+
+
+# tiktoken encodings of the OpenAI embedding models configured in WeaviateController._vector_config.
+EMBEDDING_ENCODINGS = {
+    "text-embedding-3-small": "cl100k_base",
+    "text-embedding-3-large": "cl100k_base",
+    "text-embedding-ada-002": "cl100k_base",
+}
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str = "text-embedding-3-small"):
+    """
+    Cached tiktoken encoding for an embedding model.
+    To load offline, point TIKTOKEN_CACHE_DIR at a directory holding the cached BPE files.
+    """
+    import tiktoken
+    return tiktoken.get_encoding(EMBEDDING_ENCODINGS.get(model, "cl100k_base"))
+
+
+class TokenTextChunker(FastTextChunker):
+    """
+    FastTextChunker measured in embedding-model tokens instead of characters.
+
+    ``tokenizer`` may be any object with ``encode(text)`` (e.g. a tokenizers.Tokenizer
+    loaded from a local file); by default the tiktoken encoding of ``model`` is used.
+    Token counts of every emitted chunk are kept for token_stats().
+    """
+
+    def __init__(self, max_tokens=256, overlap_tokens=32, model: str = "text-embedding-3-small",
+                 tokenizer=None, separators: Optional[List[str]] = None):
+        self.model = model
+        self.tokenizer = tokenizer or get_tokenizer(model)
+        # encode_ordinary (tiktoken) treats "<|endoftext|>"-like text as plain text instead of raising.
+        self._encode = getattr(self.tokenizer, "encode_ordinary", self.tokenizer.encode)
+        super().__init__(
+            chunk_size=max_tokens,
+            chunk_overlap=overlap_tokens,
+            separators=separators,
+            length_function=self.count_tokens,
+        )
+        self.token_counts = []
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._encode(text))
+
+    def split_with_offsets(self, text: str) -> List[Chunk]:
+        chunks = super().split_with_offsets(text)
+        self.token_counts.extend(self.length_function(chunk.text) for chunk in chunks)
+        return chunks
+
+    def token_stats(self) -> dict:
+        """Distribution of chunk token counts since the chunker was created."""
+        counts = sorted(self.token_counts)
+        if not counts:
+            return {"chunks": 0}
+
+        def percentile(p):
+            return counts[min(len(counts) - 1, int(p * len(counts)))]
+
+        return {
+            "chunks": len(counts),
+            "budget": self.chunk_size,
+            "min": counts[0],
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": counts[-1],
+            "mean": round(sum(counts) / len(counts), 1),
+            "over_budget": sum(1 for c in counts if c > self.chunk_size),
+        }
@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.extractor.docling_utils import ConvertedDocument, check_compression, saving_file
+from src.utils.logger_config import logger
+
+
+class ArtifactWriter:
+    """
+    Writes saving_file exports on a bounded background thread pool.
+
+    ``submit`` returns immediately unless ``max_pending`` documents are already
+    queued, which bounds how many DoclingDocuments are held in memory.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, compression=None):
+        """
+        :param compression: None, "gzip" or "zstd" (see write_artifact).
+        :raises ImportError: zstd was requested without the zstandard package installed.
+        """
+        check_compression(compression)
+        self.compression = compression
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+        self.failed = []
+
+    def submit(self, doc: ConvertedDocument, output_dir, save_format_list, table_extraction=False):
+        self._slots.acquire()
+        future = self.executor.submit(
+            saving_file, doc, output_dir, save_format_list, table_extraction, self.compression
+        )
+        future.add_done_callback(lambda _: self._slots.release())
+        # Keep only futures still running or failed, so long runs don't accumulate them.
+        self._futures = [(s, f) for s, f in self._futures if not f.done() or f.exception() is not None]
+        self._futures.append((doc.source, future))
+
+    def flush(self):
+        """Wait for all queued artifacts and log any write failures."""
+        for source, future in self._futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"❌ Failed to save artifacts for {source}: {e}")
+                self.failed.append((source, str(e)))
+        self._futures = []
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,174 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.extractor.docling_utils import ConvertedDocument, clean_text
+
+# Per-process copy of the parent's chunker, set once by the pool initializer.
+_worker_chunker = None
+
+
+@dataclass
+class ChunkedText:
+    """Cleaned text of one document and its chunks, with clean_text / split_texts stage timings."""
+    source: str
+    text: str
+    chunks: List[str]
+    chunk_index: List[int]
+    stages: dict = field(default_factory=dict)
+    token_counts: Optional[List[int]] = None
+    links: Optional[List[dict]] = None  # per-chunk neighbour links, when set by the caller
+
+
+def chunk_text(chunker, source, text: str) -> ChunkedText:
+    """Clean and split one document's Markdown."""
+    start = time.perf_counter()
+    ser_text = clean_text(text)
+    clean_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    chunks, chunk_index = chunker.split_texts(ser_text)
+    return ChunkedText(
+        source=str(source),
+        text=ser_text,
+        chunks=chunks,
+        chunk_index=chunk_index,
+        stages={
+            "clean_text": {"seconds": clean_seconds, "output_size": len(ser_text)},
+            "split_texts": {"seconds": time.perf_counter() - start, "output_size": len(chunks)},
+        },
+    )
+
+
+def _init_worker(chunker):
+    global _worker_chunker
+    _worker_chunker = chunker
+
+
+def _chunk_in_worker(source, text) -> ChunkedText:
+    chunked = chunk_text(_worker_chunker, source, text)
+    # Token-budgeted chunkers record per-chunk token counts; ship them back to the parent's chunker.
+    counts = getattr(_worker_chunker, "token_counts", None)
+    if counts:
+        chunked.token_counts = list(counts)
+        counts.clear()
+    return chunked
+
+
+class ChunkingPool:
+    """
+    Runs clean_text and splitting over a stream of converted documents, in input order.
+
+    With num_workers > 1 the work is spread over worker processes, each holding a copy of
+    ``chunker`` (which must be picklable); with 1 it runs in this process.
+    """
+
+    def __init__(self, chunker, num_workers: int = 1, max_in_flight: int = None):
+        """
+        :param chunker: Object with TextChunker's split_texts.
+        :param num_workers: Number of worker processes; 1 chunks in this process.
+        :param max_in_flight: Maximum number of submitted, not yet consumed documents (default 4 per worker).
+        """
+        self.chunker = chunker
+        self.num_workers = max(1, num_workers)
+        self.max_in_flight = max_in_flight or 4 * self.num_workers
+        self.executor = None
+        if self.num_workers > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                initializer=_init_worker,
+                initargs=(chunker,),
+            )
+        self._reset()
+
+    def _reset(self):
+        self.documents = 0
+        self.chunks = 0
+        # clean_text / split_texts time measured where the work ran (summed over workers).
+        self.clean_seconds = 0.0
+        self.split_seconds = 0.0
+        # Time the caller spent blocked on chunking (submitting and waiting); near zero when conversion is slower.
+        self.wait_seconds = 0.0
+        # Elapsed time of imap runs, from the first document pulled to the last result.
+        self.wall_seconds = 0.0
+
+    def imap(self, documents: Iterable[ConvertedDocument]) -> Iterator[Tuple[ConvertedDocument, Optional[ChunkedText]]]:
+        """Yield (document, ChunkedText) per document, in input order; failed conversions get None."""
+        start = time.perf_counter()
+        try:
+            yield from self._imap(documents)
+        finally:
+            self.wall_seconds += time.perf_counter() - start
+
+    def _imap(self, documents):
+        if self.executor is None:
+            for doc in documents:
+                if doc.error:
+                    yield doc, None
+                    continue
+                start = time.perf_counter()
+                chunked = chunk_text(self.chunker, doc.source, doc.text)
+                self._account(chunked, time.perf_counter() - start)
+                yield doc, chunked
+            return
+        pending = deque()
+        for doc in documents:
+            start = time.perf_counter()
+            future = None if doc.error else self.executor.submit(_chunk_in_worker, doc.source, doc.text)
+            pending.append((doc, future))
+            self.wait_seconds += time.perf_counter() - start
+            if len(pending) >= self.max_in_flight:
+                yield self._collect(*pending.popleft())
+        while pending:
+            yield self._collect(*pending.popleft())
+
+    def _collect(self, doc, future):
+        if future is None:
+            return doc, None
+        start = time.perf_counter()
+        chunked = future.result()
+        if chunked.token_counts:
+            self.chunker.token_counts.extend(chunked.token_counts)
+        self._account(chunked, time.perf_counter() - start)
+        return doc, chunked
+
+    def _account(self, chunked: ChunkedText, wait_seconds: float):
+        self.documents += 1
+        self.chunks += len(chunked.chunks)
+        self.wait_seconds += wait_seconds
+        self.clean_seconds += chunked.stages["clean_text"]["seconds"]
+        self.split_seconds += chunked.stages["split_texts"]["seconds"]
+
+    def pop_stats(self) -> dict:
+        """
+        Chunking throughput since the last call, then reset the counters.
+
+        chunks_per_second is split_texts throughput per worker-second; parallelism is worker time
+        (clean + split) over the stage's wall time, i.e. how many workers were busy on average.
+        """
+        worker_seconds = self.clean_seconds + self.split_seconds
+        stats = {
+            "workers": self.num_workers,
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "clean_seconds": round(self.clean_seconds, 3),
+            "split_seconds": round(self.split_seconds, 3),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "chunks_per_second": round(self.chunks / self.split_seconds, 1) if self.split_seconds else None,
+            "parallelism": round(worker_seconds / self.wall_seconds, 2) if self.wall_seconds else None,
+        }
+        self._reset()
+        return stats
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.utils.logger_config import logger
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    """Hash a file's content in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    On-disk cache of serialized Markdown, keyed by file content hash + converter options.
+
+    Entries are plain UTF-8 files under ``cache_dir``. When the total size exceeds
+    ``max_bytes`` the least recently used entries (by mtime, refreshed on hit) are evicted.
+    """
+
+    def __init__(self, cache_dir, options: dict, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        :param cache_dir: Directory holding the cache entries.
+        :param options: Converter options that affect the output; part of every key.
+        :param max_bytes: Size bound of the cache directory.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.options_digest = hashlib.sha256(
+            json.dumps(options, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes = sum(p.stat().st_size for p in self._entries())
+
+    def _entries(self):
+        return self.cache_dir.glob("*/*.md")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.md"
+
+    def key(self, file_path) -> Optional[str]:
+        """Cache key for a file, or None if the file cannot be read."""
+        try:
+            content_digest = file_sha256(file_path)
+        except OSError as e:
+            logger.warning(f"Cannot hash {file_path} for conversion cache: {e}")
+            return None
+        return hashlib.sha256(f"{content_digest}:{self.options_digest}".encode("utf-8")).hexdigest()
+
+    def contains(self, key: Optional[str]) -> bool:
+        return key is not None and self._path(key).exists()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Return the cached text for a key, counting the lookup as a hit or miss."""
+        path = self._path(key) if key else None
+        try:
+            text = path.read_text(encoding="utf-8") if path else None
+        except FileNotFoundError:
+            text = None
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        os.utime(path)
+        return text
+
+    def record_miss(self):
+        """Count a lookup that was already known to miss (see contains)."""
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: Optional[str], text: str):
+        """Store text under key (atomic rename), evicting old entries if over budget."""
+        if key is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += path.stat().st_size - previous
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        with self._lock:
+            self._total_bytes = sum(size for _, size, _ in entries)
+            for _, size, p in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                p.unlink(missing_ok=True)
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._total_bytes,
+        }
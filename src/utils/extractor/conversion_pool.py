@@ -0,0 +1,82 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+from src.utils.extractor.docling_utils import ConvertedDocument, convert_path
+from src.utils.extractor.page_triage import TRIAGE_PROFILES, convert_triaged
+
+# Per-process converters, built once per profile and reused for every file.
+_worker_factory = None
+_worker_converters = {}
+
+
+def _init_worker(build_converter: Callable):
+    global _worker_factory
+    _worker_factory = build_converter
+    _worker_converters["default"] = build_converter()
+
+
+def _worker_converter(profile="default"):
+    overrides = TRIAGE_PROFILES.get(profile)
+    if not overrides:
+        return _worker_converters["default"]
+    if profile not in _worker_converters:
+        _worker_converters[profile] = _worker_factory(**overrides)
+    return _worker_converters[profile]
+
+
+def _convert_in_worker(source, keep_document, page_range=None, triage=False) -> ConvertedDocument:
+    if triage:
+        return convert_triaged(_worker_converter, source)
+    return convert_path(_worker_converter(), source, keep_document=keep_document, page_range=page_range)
+
+
+class ConversionPool:
+    """Converts documents across worker processes, each holding its own DocumentConverter."""
+
+    def __init__(self, build_converter: Callable, num_workers: int = 2, max_in_flight: int = None):
+        """
+        :param build_converter: Picklable zero-argument factory returning a DocumentConverter.
+        :param num_workers: Number of worker processes.
+        :param max_in_flight: Maximum number of submitted, not yet consumed files (default 2 per worker).
+        """
+        self.num_workers = num_workers
+        self.max_in_flight = max_in_flight or 2 * num_workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_worker,
+            initargs=(build_converter,),
+        )
+
+    def imap(self, sources: Iterable, keep_document: bool = False, triage: Callable = None) -> Iterator[ConvertedDocument]:
+        """
+        Yield one ConvertedDocument per source, in input order.
+        :param triage: Predicate selecting sources converted with per-page triage (see page_triage).
+        """
+        pending = deque()
+        for source in sources:
+            use_triage = bool(triage and triage(source))
+            pending.append(self.executor.submit(_convert_in_worker, source, keep_document, None, use_triage))
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def imap_page_ranges(self, source, ranges) -> Iterator[ConvertedDocument]:
+        """Convert page ranges of one document in parallel, yielding shards in page order."""
+        pending = deque()
+        for page_range in ranges:
+            pending.append(self.executor.submit(_convert_in_worker, source, False, page_range))
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,6 +1,12 @@
-from docling_core.types.doc.document import DocItemLabel
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from docling_core.types.doc.document import DocItemLabel, DoclingDocument
+from docling_core.transforms.serializer.markdown import MarkdownDocSerializer
+from src.utils.logger_config import logger
 import yaml
 import json
+import re
 from pathlib import Path
 labels_to_include = {
     DocItemLabel.PARAGRAPH,
@@ -15,36 +21,147 @@ labels_to_include = {
     # don't include DocItemLabel.TABLE
 }
 
-def saving_file(self,res , output_dir,save_format_list=[".md"],table_extraction=False):
+
+_IMAGE_PLACEHOLDER = re.compile(r'<!--\s*image\s*-->')
+_NEWLINE_RUNS = re.compile(r'\n{2,}')
+
+
+def clean_text(text: str) -> str:
+    # Remove <!-- image -->
+    text = _IMAGE_PLACEHOLDER.sub('', text)
+    # Remove multiple newlines -> replace with single newline
+    text = _NEWLINE_RUNS.sub('\n', text).strip()
+    return text
+
+
+@dataclass
+class ConvertedDocument:
+    """Serialized Markdown of one input file, as produced by a converter."""
+    source: str
+    text: str = ""
+    document: Optional[DoclingDocument] = None
+    error: Optional[str] = None
+    triage: Optional[dict] = None
+    # stage name -> {"seconds", "output_size"}, measured where the stage ran (see PipelineMetrics)
+    stages: dict = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return Path(self.source).name
+
+    @property
+    def stem(self) -> str:
+        return Path(self.source).stem
+
+
+def to_converted_document(res, source, keep_document=True) -> ConvertedDocument:
     """
-    Save the converted document to the specified output directory.
-    :param file_path: Path to the input file.
-    :param output_dir: Directory where the converted file will be saved.
+    Serialize a docling ConversionResult to Markdown.
+    :param keep_document: Keep the DoclingDocument for table extraction / artifact export.
     """
-    stem = res.input.file.stem
+    start = time.perf_counter()
+    ser_result = MarkdownDocSerializer(doc=res.document).serialize()
+    return ConvertedDocument(
+        source=str(source),
+        text=ser_result.text,
+        document=res.document if keep_document else None,
+        stages={"serialization": {"seconds": time.perf_counter() - start, "output_size": len(ser_result.text)}},
+    )
+
+
+def merge_stages(parts) -> dict:
+    """Sum the stage timings of documents converted in parts (page ranges / triage page classes)."""
+    merged = {}
+    for stages in parts:
+        for stage, values in stages.items():
+            total = merged.setdefault(stage, {"seconds": 0.0, "output_size": 0})
+            total["seconds"] += values["seconds"]
+            total["output_size"] += values.get("output_size") or 0
+    return merged
+
+
+def convert_path(converter, source, keep_document=True, page_range=None) -> ConvertedDocument:
+    """
+    Convert a single file, returning the failure reason instead of raising.
+    :param page_range: Optional 1-based, inclusive (start, end) page range to convert.
+    """
+    start = time.perf_counter()
+    try:
+        if page_range is None:
+            res = converter.convert(source)
+        else:
+            res = converter.convert(source, page_range=page_range)
+    except Exception as e:
+        return ConvertedDocument(source=str(source), error=f"{type(e).__name__}: {e}")
+    conversion_seconds = time.perf_counter() - start
+    doc = to_converted_document(res, source, keep_document=keep_document)
+    doc.stages["conversion"] = {"seconds": conversion_seconds, "output_size": len(res.document.pages)}
+    return doc
+
+
+ARTIFACT_LABELS = {".md": "Markdown", ".txt": "Text", ".yaml": "YAML", ".json": "JSON"}
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def render_artifacts(document, save_format_list, table_extraction=False):
+    """Yield (suffix, text) per requested format; the document dict is exported once for YAML and JSON."""
     if ".md" in save_format_list:
-        md_path = output_dir / f"{stem}.md"
         if table_extraction:
-            md_text = res.document.export_to_markdown(labels=labels_to_include)
+            yield ".md", document.export_to_markdown(labels=labels_to_include)
         else:
-            md_text = res.document.export_to_markdown()
-        md_path.write_text(md_text, encoding="utf-8")
-        self.logger.info(f"   Markdown saved → {md_path}")
+            yield ".md", document.export_to_markdown()
 
     if ".txt" in save_format_list:
-        txt_path = output_dir / f"{stem}.txt"
-        txt_text = res.document.export_to_text()
-        txt_path.write_text(txt_text, encoding="utf-8")
-        self.logger.info(f"   Text saved → {txt_path}")
-
-    if ".yaml" in save_format_list:
-        yaml_path = output_dir / f"{stem}.yaml"
-        yaml_text = yaml.safe_dump(res.document.export_to_dict())
-        yaml_path.write_text(yaml_text, encoding="utf-8")
-        self.logger.info(f"   YAML saved → {yaml_path}")
-
-    if ".json" in save_format_list:
-        json_path = output_dir / f"{stem}.json"
-        json_text = json.dumps(res.document.export_to_dict(), ensure_ascii=False, indent=2)
-        json_path.write_text(json_text, encoding="utf-8")
-        self.logger.info(f"   JSON saved → {json_path}")
\ No newline at end of file
+        yield ".txt", document.export_to_text()
+
+    if ".yaml" in save_format_list or ".json" in save_format_list:
+        doc_dict = document.export_to_dict()
+        if ".yaml" in save_format_list:
+            yield ".yaml", yaml.safe_dump(doc_dict)
+        if ".json" in save_format_list:
+            yield ".json", json.dumps(doc_dict, ensure_ascii=False, indent=2)
+
+
+def check_compression(compression):
+    """Raise before any conversion work if write_artifact could not honour the compression setting."""
+    if compression and compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported artifact compression: {compression}")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError('artifact_compression="zstd" needs the zstandard package: '
+                              'install the "zstd" extra (uv sync --extra zstd)') from e
+
+
+def write_artifact(path: Path, text: str, compression=None) -> Path:
+    """
+    Write text as UTF-8, optionally compressed ("gzip" or "zstd"; zstd needs the "zstd" extra).
+    :return: The path written, including the compression suffix.
+    """
+    data = text.encode("utf-8")
+    if compression == "gzip":
+        import gzip
+        data = gzip.compress(data)
+    elif compression == "zstd":
+        import zstandard
+        data = zstandard.ZstdCompressor().compress(data)
+    elif compression:
+        raise ValueError(f"Unsupported artifact compression: {compression}")
+    path = path.with_name(path.name + COMPRESSION_SUFFIXES.get(compression, ""))
+    path.write_bytes(data)
+    return path
+
+
+def saving_file(doc: ConvertedDocument, output_dir, save_format_list=[".md"], table_extraction=False, compression=None):
+    """
+    Save the converted document to the specified output directory.
+    :param doc: ConvertedDocument holding the DoclingDocument to export.
+    :param output_dir: Directory where the converted file will be saved.
+    :param compression: None, "gzip" or "zstd".
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for suffix, text in render_artifacts(doc.document, save_format_list, table_extraction):
+        path = write_artifact(output_dir / f"{doc.stem}{suffix}", text, compression)
+        logger.info(f"   {ARTIFACT_LABELS[suffix]} saved → {path}")
@@ -0,0 +1,193 @@
+import time
+from collections import Counter
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+from docling_core.transforms.serializer.markdown import MarkdownDocSerializer, MarkdownParams
+from docling_core.types.io import DocumentStream
+
+from src.utils.extractor.docling_utils import ConvertedDocument, convert_path, merge_stages
+from src.utils.extractor.pdf_sharding import stitch_shards
+
+TEXT_ONLY = "text"
+TABLE = "table"
+IMAGE_ONLY = "image"
+
+# Converter overrides per page class; image-only pages are not converted (OCR is off).
+TRIAGE_PROFILES = {
+    TABLE: {},
+    TEXT_ONLY: {"do_table_structure": False},
+}
+
+# Ruled tables are drawn as many path objects; prose pages have few or none.
+MIN_TABLE_PATHS = 12
+# Unruled tables have no paths: they show up as sparse text whose fragments start on shared columns.
+MAX_TABLE_CHAR_DENSITY = 4.0  # characters per 1000 pt² of page area; dense prose is above this
+MIN_GRID_COLUMNS = 3
+MIN_GRID_ROWS = 3
+GRID_TOLERANCE = 2.0  # pt
+# With OCR off, a scanned page only yields its text layer (page numbers, stamps); below this it is skipped.
+MIN_SCAN_CHARS = 20
+
+
+def _snap(value: float) -> int:
+    return round(value / GRID_TOLERANCE)
+
+
+def is_grid_aligned(boxes: List[Tuple[float, float, float, float]],
+                    min_columns: int = MIN_GRID_COLUMNS, min_rows: int = MIN_GRID_ROWS) -> bool:
+    """
+    Whether text fragments line up as a table: at least min_columns left edges each shared by
+    fragments on at least min_rows distinct lines. Prose starts every line on one (or two) margins.
+    :param boxes: (left, bottom, right, top) of the text objects on a page.
+    """
+    rows_by_column = {}
+    for left, bottom, _, _ in boxes:
+        rows_by_column.setdefault(_snap(left), set()).add(_snap(bottom))
+    columns = [rows for rows in rows_by_column.values() if len(rows) >= min_rows]
+    return len(columns) >= min_columns
+
+
+def classify_page(page, min_table_paths: int = MIN_TABLE_PATHS) -> str:
+    """Classify a pypdfium2 page as text-only, table-bearing or image-only."""
+    textpage = page.get_textpage()
+    try:
+        n_chars = textpage.count_chars()
+    finally:
+        textpage.close()
+    n_paths = n_images = 0
+    text_boxes = []
+    for obj in page.get_objects():
+        if obj.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+            n_paths += 1
+        elif obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+            n_images += 1
+        elif obj.type == pdfium_c.FPDF_PAGEOBJ_TEXT:
+            text_boxes.append(obj.get_pos())
+    if n_chars == 0 or (n_images and n_chars < MIN_SCAN_CHARS):
+        return IMAGE_ONLY
+    if n_paths >= min_table_paths:
+        return TABLE
+    width, height = page.get_size()
+    density = n_chars / max(width * height / 1000, 1.0)
+    if density <= MAX_TABLE_CHAR_DENSITY and is_grid_aligned(text_boxes):
+        return TABLE
+    return TEXT_ONLY
+
+
+def classify_pdf(path) -> List[str]:
+    """Return the class of every page of a PDF, in page order."""
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        classes = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            try:
+                classes.append(classify_page(page))
+            finally:
+                page.close()
+        return classes
+    finally:
+        pdf.close()
+
+
+def page_subset(source, page_numbers: List[int]) -> DocumentStream:
+    """Copy the given 1-based pages of a PDF, in order, into an in-memory PDF."""
+    pdf = pdfium.PdfDocument(str(source))
+    subset = pdfium.PdfDocument.new()
+    try:
+        subset.import_pages(pdf, [page_no - 1 for page_no in page_numbers])
+        buffer = BytesIO()
+        subset.save(buffer)
+    finally:
+        subset.close()
+        pdf.close()
+    buffer.seek(0)
+    return DocumentStream(name=Path(str(source)).name, stream=buffer)
+
+
+def split_pages(document, page_numbers: List[int]) -> Dict[int, str]:
+    """Serialize a converted page subset page by page, keyed by the page numbers of the original PDF."""
+    return {
+        page_no: MarkdownDocSerializer(doc=document, params=MarkdownParams(pages={position})).serialize().text
+        for position, page_no in enumerate(page_numbers, start=1)
+    }
+
+
+def convert_triaged(get_converter: Callable, source) -> ConvertedDocument:
+    """
+    Convert a PDF with the table model only on table-bearing pages. The pages of each class are
+    copied into one PDF and converted in a single pass, so a document alternating between prose and
+    table pages is parsed at most twice; the per-page Markdown is stitched back in page order.
+    :param get_converter: Returns the DocumentConverter for a TRIAGE_PROFILES key.
+    """
+    try:
+        classes = classify_pdf(source)
+    except Exception as e:
+        return ConvertedDocument(source=str(source), error=f"{type(e).__name__}: {e}")
+    pages_by_class = {}
+    for page_no, page_class in enumerate(classes, start=1):
+        if page_class != IMAGE_ONLY:
+            pages_by_class.setdefault(page_class, []).append(page_no)
+    # Page-level serialization is only needed to interleave two classes.
+    interleave = len(pages_by_class) > 1
+    seconds = Counter()
+    page_texts, stages = {}, []
+    for page_class, page_numbers in pages_by_class.items():
+        class_start = time.perf_counter()
+        try:
+            subset = source if len(page_numbers) == len(classes) else page_subset(source, page_numbers)
+        except Exception as e:
+            return ConvertedDocument(source=str(source), error=f"{page_class} pages: {type(e).__name__}: {e}")
+        converted = convert_path(get_converter(page_class), subset, keep_document=interleave)
+        if converted.error:
+            return ConvertedDocument(source=str(source), error=f"{page_class} pages: {converted.error}")
+        if interleave:
+            page_texts.update(split_pages(converted.document, page_numbers))
+        else:
+            page_texts[page_numbers[0]] = converted.text
+        seconds[page_class] += time.perf_counter() - class_start
+        stages.append(converted.stages)
+    return ConvertedDocument(
+        source=str(source),
+        text=stitch_shards([page_texts[page_no] for page_no in sorted(page_texts)]),
+        triage={"pages": dict(Counter(classes)), "seconds": dict(seconds)},
+        stages=merge_stages(stages),
+    )
+
+
+class PageTriageReport:
+    """Aggregates per-class page counts and conversion time over a run."""
+
+    def __init__(self):
+        self.pages = Counter()
+        self.seconds = Counter()
+        self.documents = 0
+
+    def add(self, triage: dict):
+        self.documents += 1
+        self.pages.update(triage.get("pages", {}))
+        self.seconds.update(triage.get("seconds", {}))
+
+    def estimated_seconds_saved(self):
+        """
+        Time the full table pipeline would have spent on the pages triage skipped or
+        downgraded, from the measured per-page cost of each class. None until table pages were seen.
+        """
+        if not self.pages[TABLE]:
+            return None
+        table_rate = self.seconds[TABLE] / self.pages[TABLE]
+        text_rate = self.seconds[TEXT_ONLY] / self.pages[TEXT_ONLY] if self.pages[TEXT_ONLY] else 0.0
+        return self.pages[TEXT_ONLY] * max(0.0, table_rate - text_rate) + self.pages[IMAGE_ONLY] * table_rate
+
+    def summary(self) -> dict:
+        saved = self.estimated_seconds_saved()
+        return {
+            "documents": self.documents,
+            "pages": {cls: self.pages[cls] for cls in (TEXT_ONLY, TABLE, IMAGE_ONLY)},
+            "seconds": {cls: round(self.seconds[cls], 2) for cls in (TEXT_ONLY, TABLE)},
+            "estimated_seconds_saved": round(saved, 2) if saved is not None else None,
+        }
@@ -0,0 +1,29 @@
+from typing import List, Tuple
+
+import pypdfium2 as pdfium
+
+
+def count_pdf_pages(path) -> int:
+    """Return the number of pages of a PDF without rendering it."""
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def page_ranges(num_pages: int, pages_per_shard: int) -> List[Tuple[int, int]]:
+    """
+    Split a document into consecutive page ranges.
+    :return: 1-based, inclusive (start, end) tuples as expected by docling's ``page_range``.
+    """
+    pages_per_shard = max(1, pages_per_shard)
+    return [
+        (start, min(start + pages_per_shard - 1, num_pages))
+        for start in range(1, num_pages + 1, pages_per_shard)
+    ]
+
+
+def stitch_shards(texts: List[str]) -> str:
+    """Join per-shard Markdown in page order into one document text."""
+    return "\n\n".join(text for text in texts if text)
@@ -0,0 +1,240 @@
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Callable, Iterable, Iterator
+
+from src.utils.extractor import conversion_pool
+from src.utils.extractor.docling_utils import ConvertedDocument
+from src.utils.logger_config import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Sent by a worker once its converter is built; tasks are only assigned to ready workers.
+_READY = "ready"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss_bytes(pid: int) -> int:
+    """Resident set size of a process (psutil if available, else /proc); 0 if unknown."""
+    try:
+        if psutil is not None:
+            return psutil.Process(pid).memory_info().rss
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except Exception:
+        return 0
+
+
+def _warm_up():
+    """Load the PDF pipeline's models now rather than on the first file (counted against its timeout)."""
+    converter = conversion_pool._worker_converters["default"]
+    if not hasattr(converter, "initialize_pipeline"):
+        return
+    try:
+        from docling.datamodel.base_models import InputFormat
+        converter.initialize_pipeline(InputFormat.PDF)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not preload the conversion pipeline: {e}")
+
+
+def _supervised_worker(build_converter: Callable, conn):
+    """Worker loop: build the converter once, report ready, then convert tasks received over the pipe."""
+    conversion_pool._init_worker(build_converter)
+    _warm_up()
+    conn.send(_READY)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        task_id, source, keep_document, page_range, triage = task
+        conn.send((task_id, conversion_pool._convert_in_worker(source, keep_document, page_range, triage)))
+
+
+class _Worker:
+    def __init__(self, ctx, build_converter):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_supervised_worker, args=(build_converter, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task = None
+        self.started = None
+
+    def assign(self, task):
+        # The worker is ready and idle, so it picks the task up right away: the clock starts here.
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send(task)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SupervisedConversionPool:
+    """
+    Conversion pool where every file runs under a wall-clock timeout and an RSS ceiling.
+
+    A worker that breaches a limit (or crashes) is killed and replaced; its file is
+    returned as a ConvertedDocument with ``error`` set, and the other workers keep going.
+    A worker that dies while starting up is replaced as well; only ``max_start_failures``
+    startups failing in a row (e.g. a broken model install) abort the run.
+    Same interface as ConversionPool.
+    """
+
+    def __init__(self, build_converter: Callable, num_workers: int = 2, timeout: float = None,
+                 max_rss_mb: int = None, max_in_flight: int = None, poll_interval: float = 0.5,
+                 max_start_failures: int = 3):
+        """
+        :param build_converter: Picklable factory returning a DocumentConverter (see ConversionPool).
+        :param timeout: Seconds a single file may take; None disables the limit.
+        :param max_rss_mb: Resident memory ceiling per worker; None disables the limit.
+        :param max_start_failures: Consecutive worker startup failures tolerated before raising.
+        """
+        self.build_converter = build_converter
+        self.num_workers = num_workers
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.max_in_flight = max_in_flight or 2 * num_workers
+        self.poll_interval = poll_interval
+        self.max_start_failures = max_start_failures
+        self._start_failures = 0
+        self._ctx = mp.get_context()
+        self._workers = [_Worker(self._ctx, build_converter) for _ in range(num_workers)]
+        # Shared by all runs on this pool: pending tasks and finished results, keyed by pool-wide task id.
+        self._queued = deque()
+        self._results = {}
+        self._next_id = 0
+        self.recycled = 0
+
+    def _recycle(self, worker: _Worker, reason: str):
+        task_id, source = worker.task[0], worker.task[1]
+        logger.warning(f"⚠️ Killing conversion worker {worker.process.pid} on {source}: {reason}")
+        worker.kill()
+        self._workers[self._workers.index(worker)] = _Worker(self._ctx, self.build_converter)
+        self.recycled += 1
+        return task_id, ConvertedDocument(source=str(source), error=reason)
+
+    def _respawn_unstarted(self, worker: _Worker):
+        """Replace a worker that died before reporting ready; raise once startups keep failing."""
+        self._start_failures += 1
+        exitcode = worker.process.exitcode
+        worker.kill()
+        if self._start_failures >= self.max_start_failures:
+            raise RuntimeError(f"Conversion worker failed to start {self._start_failures} times in a row "
+                               f"(last exit code {exitcode})")
+        logger.warning(f"⚠️ Conversion worker {worker.process.pid} died while starting (exit code {exitcode}); "
+                       f"respawning ({self._start_failures}/{self.max_start_failures})")
+        self._workers[self._workers.index(worker)] = _Worker(self._ctx, self.build_converter)
+
+    def _check_limits(self, worker: _Worker):
+        """Return the breach reason for a busy worker, or None."""
+        if not worker.process.is_alive():
+            return f"worker crashed (exit code {worker.process.exitcode})"
+        if self.timeout and time.monotonic() - worker.started > self.timeout:
+            return f"timeout after {self.timeout:.0f}s"
+        if self.max_rss_bytes:
+            rss = process_rss_bytes(worker.process.pid)
+            if rss > self.max_rss_bytes:
+                return f"RSS {rss / (1024 * 1024):.0f}MB over {self.max_rss_bytes / (1024 * 1024):.0f}MB limit"
+        return None
+
+    def _dispatch(self):
+        for worker in self._workers:
+            if worker.ready and worker.task is None and self._queued:
+                worker.assign(self._queued.popleft())
+
+    def _poll(self):
+        """Collect finished tasks and ready messages, and recycle workers over a limit."""
+        for conn in wait([w.conn for w in self._workers], timeout=self.poll_interval):
+            worker = next((w for w in self._workers if w.conn is conn), None)
+            if worker is None:
+                continue
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                continue  # died mid-send; handled by the checks below
+            if message == _READY:
+                worker.ready = True
+                self._start_failures = 0
+                continue
+            task_id, res = message
+            self._results[task_id] = res
+            worker.task = None
+        for worker in list(self._workers):
+            if not worker.ready:
+                if not worker.process.is_alive():
+                    self._respawn_unstarted(worker)
+                continue
+            if worker.task is None:
+                continue
+            reason = self._check_limits(worker)
+            if reason:
+                task_id, res = self._recycle(worker, reason)
+                self._results[task_id] = res
+
+    def _run(self, tasks: Iterable) -> Iterator[ConvertedDocument]:
+        """
+        Run (source, keep_document, page_range, triage) tasks, yielding results in task order.
+        Task ids are pool-wide and results are routed by id, so runs may nest or interleave
+        on the same workers (e.g. converting an evicted cache entry mid-stream).
+        """
+        tasks = iter(tasks)
+        own = deque()  # this run's task ids, in order
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(own) < self.max_in_flight:
+                    try:
+                        task = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    task_id = self._next_id
+                    self._next_id += 1
+                    self._queued.append((task_id, *task))
+                    own.append(task_id)
+                self._dispatch()
+                while own and own[0] in self._results:
+                    yield self._results.pop(own.popleft())
+                if exhausted and not own:
+                    return
+                self._poll()
+        finally:
+            # An abandoned run: drop its pending tasks and any result already collected for it.
+            if own:
+                dropped = set(own)
+                self._queued = deque(task for task in self._queued if task[0] not in dropped)
+                for task_id in dropped:
+                    self._results.pop(task_id, None)
+
+    def imap(self, sources: Iterable, keep_document: bool = False, triage: Callable = None) -> Iterator[ConvertedDocument]:
+        return self._run((source, keep_document, None, bool(triage and triage(source))) for source in sources)
+
+    def imap_page_ranges(self, source, ranges) -> Iterator[ConvertedDocument]:
+        return self._run((source, False, page_range, False) for page_range in ranges)
+
+    def close(self):
+        for worker in self._workers:
+            try:
+                if worker.process.is_alive() and worker.task is None:
+                    worker.conn.send(None)
+                    worker.process.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+            if worker.process.is_alive():
+                worker.kill()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
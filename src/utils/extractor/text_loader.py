@@ -0,0 +1,75 @@
+import codecs
+import csv
+import io
+from pathlib import Path
+
+from src.utils.extractor.docling_utils import ConvertedDocument
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+# Formats read directly instead of going through the Docling layout/table pipeline.
+FAST_PATH_EXTENSIONS = {".txt", ".md", ".csv"}
+
+# Tried in order after BOM detection; cp932 covers Shift_JIS files exported from Windows/Excel.
+FALLBACK_ENCODINGS = ["utf-8", "cp932", "euc_jp"]
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def is_fast_path(path) -> bool:
+    return Path(path).suffix.lower() in FAST_PATH_EXTENSIONS
+
+
+def decode_bytes(data: bytes) -> str:
+    """Decode file content, detecting the encoding from BOM, strict decoding, then charset detection."""
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding)
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    if from_bytes is not None:
+        best = from_bytes(data).best()
+        if best is not None:
+            return str(best)
+    return data.decode("utf-8", errors="replace")
+
+
+def csv_to_markdown(text: str) -> str:
+    """Render CSV text as a Markdown table, the same shape Docling produces for CSV input."""
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",\t;")
+    except csv.Error:
+        dialect = csv.excel
+    rows = [row for row in csv.reader(io.StringIO(text), dialect) if any(cell.strip() for cell in row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        cells = [cell.strip().replace("|", "\\|").replace("\n", " ") for cell in row]
+        cells += [""] * (width - len(cells))
+        lines.append("| " + " | ".join(cells) + " |")
+        if i == 0:
+            lines.append("|" + "---|" * width)
+    return "\n".join(lines)
+
+
+def read_text_document(path) -> ConvertedDocument:
+    """Read a .txt/.md/.csv file directly into a ConvertedDocument."""
+    try:
+        text = decode_bytes(Path(path).read_bytes())
+    except OSError as e:
+        return ConvertedDocument(source=str(path), error=f"{type(e).__name__}: {e}")
+    if Path(path).suffix.lower() == ".csv":
+        text = csv_to_markdown(text)
+    return ConvertedDocument(source=str(path), text=text)
@@ -0,0 +1,38 @@
+"""
+Timed, on-demand imports for heavy subsystems (docling, weaviate, SQLAlchemy, pandas).
+
+Usage:
+    from src.utils.import_profiler import timed_import, import_report
+
+    document_controller = timed_import("src.controller.document_controller")
+    print(import_report())
+
+For a full per-module tree run ``python -X importtime main.py``.
+"""
+import importlib
+import sys
+import time
+
+# module name -> seconds spent on its first import (including its own dependencies)
+IMPORT_TIMES = {}
+
+
+def timed_import(module_name: str):
+    """Import a module on first use and record how long the import took."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+
+def import_report() -> str:
+    """Format recorded import costs, most expensive first."""
+    if not IMPORT_TIMES:
+        return "No lazy imports recorded."
+    lines = ["Import cost (s):"]
+    for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {seconds:8.3f}  {name}")
+    lines.append(f"  {sum(IMPORT_TIMES.values()):8.3f}  total")
+    return "\n".join(lines)
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from src.utils.extractor.conversion_cache import file_sha256
+from src.utils.logger_config import logger
+
+DEFAULT_MANIFEST_PATH = "ingest_manifest.sqlite3"
+
+DONE = "done"
+FAILED = "failed"
+STARTED = "started"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    sha256 TEXT,
+    chunk_count INTEGER,
+    status TEXT NOT NULL,
+    error TEXT,
+    timings TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    PRIMARY KEY (path, collection)
+)
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class IngestManifest:
+    """
+    Per-(file, collection) ingestion state in SQLite (WAL mode, one transaction per update).
+
+    A file is unchanged when its size and mtime match the last successful ingest; if only the
+    mtime moved (copy, touch, checkout), the content hash decides and the stored stat is refreshed.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(_SCHEMA)
+
+    def _row(self, path, collection):
+        return self.conn.execute(
+            "SELECT size, mtime, sha256, status FROM files WHERE path = ? AND collection = ?",
+            (str(path), collection),
+        ).fetchone()
+
+    def is_unchanged(self, path, collection: str) -> bool:
+        """True when the file was ingested into the collection successfully and has not changed since."""
+        row = self._row(path, collection)
+        if row is None or row[3] != DONE:
+            return False
+        size, mtime, sha256, _ = row
+        stat = os.stat(path)
+        if stat.st_size == size and stat.st_mtime == mtime:
+            return True
+        if stat.st_size != size or sha256 is None:
+            return False
+        if file_sha256(path) != sha256:
+            return False
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET mtime = ? WHERE path = ? AND collection = ?", (stat.st_mtime, str(path), collection)
+            )
+        return True
+
+    def filter_changed(self, paths: Iterable, collection: str) -> List:
+        """Paths that are new, changed or previously failed for the collection, in input order."""
+        changed, skipped = [], 0
+        for path in paths:
+            try:
+                unchanged = self.is_unchanged(path, collection)
+            except FileNotFoundError:
+                print(f"File not found, skipping: {path}")
+                continue
+            if unchanged:
+                skipped += 1
+            else:
+                changed.append(path)
+        print(f"📒 Manifest: {len(changed)} new or changed, {skipped} unchanged file(s) skipped")
+        return changed
+
+    def mark_started(self, paths: Iterable, collection: str):
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO files (path, collection, status, started_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (path, collection) DO UPDATE SET
+                    status = excluded.status, started_at = excluded.started_at, error = NULL
+                """,
+                [(str(path), collection, STARTED, _now()) for path in paths],
+            )
+
+    def mark_done(self, path, collection: str, chunk_count: int, timings: dict = None):
+        """Record a successful ingest with the file's current size, mtime and content hash."""
+        stat = os.stat(path)
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO files (path, collection, size, mtime, sha256, chunk_count, status, timings, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path, collection) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime, sha256 = excluded.sha256,
+                    chunk_count = excluded.chunk_count, status = excluded.status, error = NULL,
+                    timings = excluded.timings, finished_at = excluded.finished_at
+                """,
+                (str(path), collection, stat.st_size, stat.st_mtime, file_sha256(path), chunk_count, DONE,
+                 json.dumps(timings or {}), _now()),
+            )
+
+    def mark_failed(self, failures: Iterable[Tuple[str, str]], collection: str):
+        """Record (path, error) pairs; failed files are picked up again on the next run."""
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO files (path, collection, status, error, finished_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (path, collection) DO UPDATE SET
+                    status = excluded.status, error = excluded.error, finished_at = excluded.finished_at
+                """,
+                [(str(path), collection, FAILED, error, _now()) for path, error in failures],
+            )
+
+    def import_processed_log(self, log_file, collection: str) -> int:
+        """
+        One-off migration from a processed_files.txt-style log: listed files that are not in the
+        manifest yet are recorded as done with their current stat (chunk count unknown).
+        """
+        if not os.path.exists(log_file):
+            return 0
+        with open(log_file, "r", encoding="utf-8") as f:
+            paths = [line.strip() for line in f if line.strip()]
+        imported = 0
+        for path in dict.fromkeys(paths):
+            if self._row(path, collection) is not None or not os.path.exists(path):
+                continue
+            self.mark_done(path, collection, chunk_count=None)
+            imported += 1
+        if imported:
+            logger.info(f"Imported {imported} files from {log_file} into {self.path}")
+        return imported
+
+    def forget_collection(self, collection: str) -> int:
+        """Drop all rows of a collection (e.g. after it was deleted), so every file is ingested again."""
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM files WHERE collection = ?", (collection,)).rowcount
+        if removed:
+            logger.info(f"Cleared {removed} manifest entries of {collection}")
+        return removed
+
+    def summary(self, collection: str = None) -> dict:
+        query = "SELECT status, COUNT(*), SUM(chunk_count) FROM files"
+        params = ()
+        if collection is not None:
+            query += " WHERE collection = ?"
+            params = (collection,)
+        rows = self.conn.execute(query + " GROUP BY status", params).fetchall()
+        return {status: {"files": files, "chunks": chunks or 0} for status, files, chunks in rows}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.logger_config import logger
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
+except ImportError:
+    Counter = Gauge = Histogram = start_http_server = None
+
+# Document pipeline stages, in execution order; the unit is what each stage's output size counts.
+STAGES = {
+    "conversion": "pages",
+    "serialization": "chars",
+    "clean_text": "chars",
+    "split_texts": "chunks",
+    "chunking": "chunks",  # clean_text + split_texts summed over chunk workers (per run)
+    "uuid_generation": "objects",
+    "existence_check": "objects",  # bulk UUID lookups before insert (skip-existing)
+    "embedding": "objects",  # client-side embedding (cache lookups + embedder calls)
+    "insert": "objects",
+    "sync": "chunks",  # incremental per-source diff + apply
+}
+
+_prometheus = {}
+# ports start_metrics_server already serves /metrics on in this process
+_started_ports = set()
+
+
+def _prometheus_metrics():
+    """Create the process-wide Prometheus collectors once (registering twice raises)."""
+    if Histogram is None:
+        return None
+    if not _prometheus:
+        _prometheus["seconds"] = Histogram(
+            "etl_stage_seconds", "Time spent per item in a document pipeline stage", ["stage"],
+            buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+        )
+        _prometheus["output"] = Counter(
+            "etl_stage_output_total", "Output produced by a document pipeline stage (see STAGES for units)", ["stage"],
+        )
+        _prometheus["items"] = Counter(
+            "etl_stage_items_total", "Documents or batches processed by a pipeline stage", ["stage"],
+        )
+        _prometheus["queue_depth"] = Gauge(
+            "etl_queue_depth", "Items waiting in a queue between pipeline stages", ["queue"],
+        )
+        _prometheus["query_cache"] = Counter(
+            "etl_query_cache_total", "Hybrid query result cache lookups", ["result"],
+        )
+        _prometheus["query_cache_saved"] = Counter(
+            "etl_query_cache_saved_seconds_total", "Query time saved by result cache hits",
+        )
+    return _prometheus
+
+
+def observe_queue_depth(queue: str, depth: int):
+    """Publish the current depth of an inter-stage queue (no-op without prometheus_client)."""
+    metrics = _prometheus_metrics()
+    if metrics is not None:
+        metrics["queue_depth"].labels(queue=queue).set(depth)
+
+
+def observe_query_cache(hit: bool, saved_seconds: float = 0.0):
+    """Count a query result cache lookup (no-op without prometheus_client)."""
+    metrics = _prometheus_metrics()
+    if metrics is not None:
+        metrics["query_cache"].labels(result="hit" if hit else "miss").inc()
+        if hit:
+            metrics["query_cache_saved"].inc(saved_seconds)
+
+
+def start_metrics_server(port: int = 9108) -> bool:
+    """
+    Expose /metrics for Prometheus, once per port per process (later calls are no-ops).
+    Returns False when prometheus_client is not installed.
+    """
+    if start_http_server is None:
+        logger.warning("prometheus_client is not installed; metrics are only written to the run report.")
+        return False
+    if port in _started_ports:
+        return True
+    _prometheus_metrics()
+    start_http_server(port)
+    _started_ports.add(port)
+    logger.info(f"Prometheus metrics exposed on :{port}/metrics")
+    return True
+
+
+class PipelineMetrics:
+    """Per-document (and per-insert-batch) stage timings and output sizes for one ingest run."""
+
+    def __init__(self, run_name: str = "document_ingest"):
+        self.run_name = run_name
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self.documents = defaultdict(dict)
+        self.batches = []
+        self.queues = {}
+        self._lock = threading.Lock()
+
+    def record(self, source, stage: str, seconds: float, output_size: int = None):
+        """Record one stage of one document."""
+        with self._lock:
+            self.documents[str(source)][stage] = {"seconds": round(seconds, 4), "output_size": output_size}
+        self._observe(stage, seconds, output_size)
+
+    def record_batch(self, stage: str, seconds: float, output_size: int, sources=()):
+        """Record a stage that runs per insert batch rather than per document."""
+        with self._lock:
+            self.batches.append({
+                "stage": stage,
+                "seconds": round(seconds, 4),
+                "output_size": output_size,
+                "sources": sorted(set(map(str, sources))),
+            })
+        self._observe(stage, seconds, output_size)
+
+    def record_queues(self, queues: dict):
+        """Record depth statistics of the queues between pipeline stages."""
+        with self._lock:
+            self.queues.update(queues)
+
+    def record_stages(self, source, stages: dict):
+        """Record stages measured elsewhere, e.g. in a conversion worker process."""
+        for stage, values in (stages or {}).items():
+            self.record(source, stage, values["seconds"], values.get("output_size"))
+
+    @contextmanager
+    def stage(self, source, stage: str):
+        """
+        Time a block for one document; set ``result["output_size"]`` inside the block.
+
+            with metrics.stage(path, "clean_text") as result:
+                text = clean_text(raw)
+                result["output_size"] = len(text)
+        """
+        result = {"output_size": None}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            self.record(source, stage, time.perf_counter() - start, result["output_size"])
+
+    def _observe(self, stage, seconds, output_size):
+        metrics = _prometheus_metrics()
+        if metrics is None:
+            return
+        metrics["seconds"].labels(stage=stage).observe(seconds)
+        metrics["items"].labels(stage=stage).inc()
+        if output_size:
+            metrics["output"].labels(stage=stage).inc(output_size)
+
+    def summary(self) -> dict:
+        """Totals and throughput per stage."""
+        totals = defaultdict(lambda: {"items": 0, "seconds": 0.0, "output_size": 0})
+        with self._lock:
+            entries = [(stage, v) for stages in self.documents.values() for stage, v in stages.items()]
+            entries += [(b["stage"], b) for b in self.batches]
+        for stage, values in entries:
+            total = totals[stage]
+            total["items"] += 1
+            total["seconds"] += values["seconds"]
+            total["output_size"] += values["output_size"] or 0
+        summary = {}
+        for stage in list(STAGES) + sorted(set(totals) - set(STAGES)):
+            if stage not in totals:
+                continue
+            total = totals[stage]
+            summary[stage] = {
+                "items": total["items"],
+                "seconds": round(total["seconds"], 3),
+                "output_size": total["output_size"],
+                "unit": STAGES.get(stage),
+                "per_second": round(total["output_size"] / total["seconds"], 2) if total["seconds"] else None,
+            }
+        return summary
+
+    def report(self) -> dict:
+        with self._lock:
+            documents = {source: dict(stages) for source, stages in self.documents.items()}
+            batches = list(self.batches)
+            queues = dict(self.queues)
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self._start, 3),
+            "stages": self.summary(),
+            "queues": queues,
+            "documents": documents,
+            "batches": batches,
+        }
+
+    def write_report(self, path):
+        """Write the run report as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(f"Pipeline run report saved → {path}")
@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+import weaviate.classes as wvc
+from weaviate.classes.query import Filter
+from weaviate.util import generate_uuid5
+
+from src.utils.logger_config import logger
+from src.utils.vectorDB.batch_ingest import FailedObject, InsertResult, is_retryable
+from src.utils.vectorDB.neighbour_links import chunk_properties
+from src.utils.vectorDB.query_cache import bump_generation
+
+
+class AsyncWeaviateWriter:
+    """
+    Writes (source, chunk_index, text, links) records through an async collection's insert_many.
+
+    Mirrors WeaviateUtils.insert_data: same property order (so the same UUIDs), optional
+    skip-existing check, client-side embeddings and dead-lettering, and retries with backoff
+    for objects rejected with a rate-limit / timeout error and for existence checks, embedder calls and
+    insert_many calls that raise; after the last attempt the objects are returned as failures.
+    """
+
+    def __init__(self, collection, level, origin, embedder=None, dead_letter=None, skip_existing: bool = False,
+                 max_retries: int = 3, backoff: float = 2.0, metrics=None):
+        self.collection = collection
+        self.level = level
+        self.origin = origin
+        self.embedder = embedder
+        self.dead_letter = dead_letter
+        self.skip_existing = skip_existing
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.metrics = metrics
+
+    async def _existing_ids(self, uuids) -> set:
+        response = await self.collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(uuids),
+            return_properties=[],
+            limit=len(uuids),
+        )
+        return {str(obj.uuid) for obj in response.objects}
+
+    def _delay(self, attempt: int) -> float:
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+
+    async def _with_retries(self, what: str, call: Callable[[], Awaitable]):
+        """Await call(), retrying exceptions with the insert backoff; the last exception propagates."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._delay(attempt)
+                logger.warning(f"⚠️ {what} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _give_up(result: InsertResult, rows, error: Exception):
+        """Count (properties, uuid) rows as failed, so they are dead-lettered and their sources not marked done."""
+        message = f"{type(error).__name__}: {error}"
+        result.failed += len(rows)
+        result.failures.extend(FailedObject(str(uuid), dict(properties), message) for properties, uuid in rows)
+
+    async def insert(self, records: List[Tuple]) -> InsertResult:
+        result = InsertResult()
+        rows = []
+        for source, index, text, links in records:
+            # Same property order as insert_into_weaviate, so generated UUIDs match.
+            properties = chunk_properties(text, source, self.level, self.origin, index)
+            uuid = generate_uuid5(properties)
+            if links:
+                properties.update(links)
+            rows.append((properties, uuid))
+        vectors = [None] * len(rows)
+        try:
+            if self.skip_existing and rows:
+                uuids = [uuid for _, uuid in rows]
+                existing = await self._with_retries("Existence check", lambda: self._existing_ids(uuids))
+                result.skipped = len(existing)
+                rows = [row for row in rows if row[1] not in existing]
+                vectors = [None] * len(rows)
+            if self.embedder and rows:
+                texts = [properties["content"] for properties, _ in rows]
+                embedded = await self._with_retries("Embedding", lambda: asyncio.to_thread(self.embedder.embed, texts))
+                vectors = [{"text_vector": vector.tolist()} for vector in embedded]
+        except Exception as e:
+            logger.error(f"❌ Giving up on {len(rows)} objects: {type(e).__name__}: {e}")
+            self._give_up(result, rows, e)
+            rows, vectors = [], []
+        objects = [
+            wvc.data.DataObject(properties=properties, uuid=uuid, vector=vector)
+            for (properties, uuid), vector in zip(rows, vectors)
+        ]
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            if not objects:
+                break
+            try:
+                response = await self.collection.data.insert_many(objects)
+            except Exception as e:
+                # The whole request failed (connection reset, timeout, ...): retry it, then dead-letter it.
+                if attempt < self.max_retries:
+                    delay = self._delay(attempt)
+                    logger.warning(f"⚠️ insert_many failed ({type(e).__name__}: {e}); retrying {len(objects)} objects "
+                                   f"in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(delay)
+                    result.retried += len(objects)
+                    continue
+                logger.error(f"❌ insert_many failed after {self.max_retries} retries: {type(e).__name__}: {e}")
+                self._give_up(result, [(obj.properties, obj.uuid) for obj in objects], e)
+                break
+            bump_generation(self.collection.name)
+            errors = response.errors if response.has_errors else {}
+            result.inserted += len(objects) - len(errors)
+            retry = []
+            for position, error in errors.items():
+                obj = objects[position]
+                if attempt < self.max_retries and is_retryable(error.message):
+                    retry.append(obj)
+                else:
+                    result.failed += 1
+                    result.failures.append(FailedObject(str(obj.uuid), dict(obj.properties), error.message))
+            if retry:
+                delay = self._delay(attempt)
+                logger.warning(f"⚠️ Retrying {len(retry)} objects in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                result.retried += len(retry)
+            objects = retry
+        if self.metrics:
+            self.metrics.record_batch("insert", time.perf_counter() - start, len(records), [r[0] for r in records])
+        if result.failures and self.dead_letter is not None:
+            self.dead_letter.add(self.collection.name, result.failures)
+        return result
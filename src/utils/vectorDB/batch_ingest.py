@@ -0,0 +1,118 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Tuple
+
+from src.utils.logger_config import logger
+
+# Substrings of batch error messages that mean "try again later" (vectorizer or server throttling).
+RETRYABLE_ERRORS = ("429", "rate limit", "ratelimit", "too many requests", "timeout", "timed out", "503", "unavailable")
+
+
+def is_retryable(message: str) -> bool:
+    message = (message or "").lower()
+    return any(marker in message for marker in RETRYABLE_ERRORS)
+
+
+@dataclass
+class FailedObject:
+    """An object the ingestor gave up on."""
+    uuid: str
+    properties: dict
+    error: str
+
+
+@dataclass
+class InsertResult:
+    inserted: int = 0
+    failed: int = 0
+    retried: int = 0
+    skipped: int = 0  # already stored under the same UUID
+    failures: List[FailedObject] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        summary = {"inserted": self.inserted, "failed": self.failed, "retried": self.retried}
+        if self.skipped:
+            total = self.skipped + self.inserted + self.failed
+            summary.update(skipped=self.skipped, skip_rate=round(self.skipped / total, 3))
+        return summary
+
+
+class BatchIngestor:
+    """
+    Streams (properties, uuid[, vector]) tuples into a collection with the client's fixed-size batching.
+
+    Objects are added as they are produced, so memory stays flat regardless of the load size.
+    When new errors show up while streaming, adding pauses with exponential backoff; afterwards
+    objects that failed with a retryable error (rate limit, timeout) are re-sent up to max_retries
+    times. Everything else ends up in InsertResult.failures.
+    """
+
+    def __init__(self, collection, batch_size: int = 100, concurrent_requests: int = 2,
+                 max_retries: int = 3, backoff: float = 2.0, max_backoff: float = 60.0):
+        """
+        :param batch_size: Objects per batch request.
+        :param concurrent_requests: Batch requests in flight at once.
+        :param max_retries: Retry rounds for objects that failed with a retryable error.
+        :param backoff: Initial backoff in seconds; doubles per consecutive throttled check.
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.concurrent_requests = concurrent_requests
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def _send(self, objects: Iterable[Tuple], result: InsertResult) -> list:
+        """Send one pass of objects; returns the client's failed objects."""
+        sent = 0
+        errors_seen, throttled = 0, 0
+        with self.collection.batch.fixed_size(
+            batch_size=self.batch_size, concurrent_requests=self.concurrent_requests
+        ) as batch:
+            for properties, uuid, *vector in objects:
+                # vector: None (vectorized server-side) or {"text_vector": [...]}
+                batch.add_object(properties=properties, uuid=uuid, vector=vector[0] if vector else None)
+                sent += 1
+                if sent % self.batch_size:
+                    continue
+                # Errors appearing mid-stream usually mean the vectorizer is throttling us.
+                if batch.number_errors > errors_seen:
+                    errors_seen = batch.number_errors
+                    delay = self._delay(throttled)
+                    throttled += 1
+                    logger.warning(f"⚠️ {errors_seen} batch errors so far; backing off {delay:.1f}s")
+                    time.sleep(delay)
+                else:
+                    throttled = 0
+        failed = list(self.collection.batch.failed_objects)
+        result.inserted += sent - len(failed)
+        return failed
+
+    def ingest(self, objects: Iterable[Tuple]) -> InsertResult:
+        """Insert (properties, uuid[, vector]) tuples and return inserted / failed / retried counts."""
+        result = InsertResult()
+        failed = self._send(objects, result)
+        for attempt in range(self.max_retries + 1):
+            retry = []
+            for error in failed:
+                if attempt < self.max_retries and is_retryable(error.message):
+                    retry.append(error.object_)
+                else:
+                    result.failed += 1
+                    result.failures.append(FailedObject(
+                        uuid=str(error.object_.uuid),
+                        properties=dict(error.object_.properties or {}),
+                        error=error.message,
+                    ))
+            if not retry:
+                break
+            delay = self._delay(attempt)
+            logger.warning(f"⚠️ Retrying {len(retry)} objects in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+            result.retried += len(retry)
+            failed = self._send(((obj.properties, obj.uuid, getattr(obj, "vector", None)) for obj in retry), result)
+        return result
@@ -0,0 +1,84 @@
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from weaviate.util import generate_uuid5
+
+from src.utils.vectorDB.neighbour_links import chunk_properties
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoredChunk:
+    """A chunk already in the collection."""
+    uuid: str
+    content_hash: str
+    chunk_index: int
+    level: str = None
+    origin: str = None
+    links: dict = None  # stored prev_id / next_id / chunk_count
+
+
+@dataclass
+class ChunkDiff:
+    """What it takes to turn the stored chunks of one source into the new chunk set."""
+    insert: List[Tuple[int, str]] = field(default_factory=list)  # (chunk_index, content)
+    delete: List[str] = field(default_factory=list)  # uuids
+    # Stored content whose UUID key (chunk_index / level / origin) changed: (old uuid, chunk_index, content).
+    # Re-inserted under the new deterministic UUID, reusing the stored vector, then the old object is deleted.
+    move: List[Tuple[str, int, str]] = field(default_factory=list)
+    update: List[Tuple[str, Dict]] = field(default_factory=list)  # (uuid, changed link properties)
+    unchanged: int = 0
+    kept: Dict[int, str] = field(default_factory=dict)  # chunk_index -> uuid of the chunk after the sync
+
+    def summary(self) -> dict:
+        return {
+            "inserted": len(self.insert),
+            "deleted": len(self.delete),
+            "moved": len(self.move),
+            "updated": len(self.update),
+            "unchanged": self.unchanged,
+        }
+
+
+def diff_chunks(stored: List[StoredChunk], contents: List[str], chunk_indexes: List[int],
+                source, level, origin) -> ChunkDiff:
+    """
+    Match new chunks to stored ones by content hash.
+
+    A stored object whose UUID is the one the new chunk would get (same content, source, level,
+    origin and chunk_index) is kept as is. Other content matches are moved: the UUID is derived
+    from chunk_index, level and origin, so they can't be updated in place without breaking
+    skip-existing checks, neighbour links and dead-letter keys. Duplicate contents are matched
+    one-to-one. Unmatched new chunks are inserted, unmatched stored chunks deleted.
+    """
+    by_hash = defaultdict(list)
+    for chunk in stored:
+        by_hash[chunk.content_hash].append(chunk)
+
+    diff = ChunkDiff()
+    unmatched = []
+    # First pass keeps chunks already stored under their UUID, so shifted duplicates don't steal them.
+    for content, index in zip(contents, chunk_indexes):
+        uuid = str(generate_uuid5(chunk_properties(content, source, level, origin, index)))
+        candidates = by_hash.get(content_hash(content), [])
+        match = next((c for c in candidates if c.uuid == uuid), None)
+        if match is None:
+            unmatched.append((content, index, uuid))
+            continue
+        candidates.remove(match)
+        diff.kept[index] = uuid
+        diff.unchanged += 1
+    for content, index, uuid in unmatched:
+        candidates = by_hash.get(content_hash(content), [])
+        if candidates:
+            diff.move.append((candidates.pop(0).uuid, index, content))
+        else:
+            diff.insert.append((index, content))
+        diff.kept[index] = uuid
+    diff.delete = [c.uuid for candidates in by_hash.values() for c in candidates]
+    return diff
@@ -0,0 +1,89 @@
+import atexit
+import threading
+from typing import Callable, Hashable
+
+from src.utils.logger_config import logger
+
+
+class ClientRegistry:
+    """
+    Process-wide pool of Weaviate clients, one per connection key.
+
+    ``acquire`` hands out the shared client for a key (connecting on first use) and counts
+    references; ``release`` drops a reference but keeps the connection open for the next task.
+    A cached client is checked (is_connected / is_ready, one readiness request) every time it is
+    handed out again and reconnected in place if the check fails, so holders keep a valid object
+    even after a server restart between tasks. Everything still open is closed at interpreter exit.
+    """
+
+    def __init__(self):
+        self._entries = {}  # key -> {"client", "refs"}
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+        self.reconnects = 0
+
+    @staticmethod
+    def _healthy(client) -> bool:
+        try:
+            return client.is_connected() and client.is_ready()
+        except Exception:
+            return False
+
+    def acquire(self, key: Hashable, connect: Callable):
+        """Shared client for key; ``connect()`` opens it the first time."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"client": connect(), "refs": 0}
+                self._entries[key] = entry
+                self.connects += 1
+            else:
+                self.reuses += 1
+                self._check(entry)
+            entry["refs"] += 1
+            return entry["client"]
+
+    def _check(self, entry):
+        """Reconnect a cached client that is no longer live; connection errors from connect() propagate."""
+        client = entry["client"]
+        if self._healthy(client):
+            return
+        logger.warning("⚠️ Shared Weaviate client failed its liveness check; reconnecting")
+        try:
+            client.close()
+        except Exception:
+            pass
+        client.connect()
+        self.reconnects += 1
+
+    def release(self, client):
+        """Drop one reference to a client from acquire; the connection stays open for reuse."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry["client"] is client:
+                    entry["refs"] = max(0, entry["refs"] - 1)
+                    return
+
+    def close_all(self):
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), {}
+        for entry in entries:
+            try:
+                entry["client"].close()
+            except Exception as e:
+                logger.warning(f"⚠️ Error closing Weaviate client: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry["refs"]),
+                "connects": self.connects,
+                "reuses": self.reuses,
+                "reconnects": self.reconnects,
+            }
+
+
+CLIENTS = ClientRegistry()
+atexit.register(CLIENTS.close_all)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+DEFAULT_META_TTL = 300.0
+
+
+class CollectionMetaCache:
+    """
+    Cached ``collection.config.get()`` for one collection, refreshed after ttl seconds.
+
+    Answers config and property-existence questions without a round-trip per query.
+    Call invalidate() when the schema changes (see invalidate_collection_meta).
+    """
+
+    def __init__(self, collection, ttl: float = DEFAULT_META_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._config = None
+        self._properties = frozenset()
+        self._fetched = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def config(self):
+        with self._lock:
+            if self._config is None or time.monotonic() - self._fetched >= self.ttl:
+                self.misses += 1
+                self._config = self.collection.config.get()
+                self._properties = frozenset(p.name for p in self._config.properties)
+                self._fetched = time.monotonic()
+            else:
+                self.hits += 1
+            return self._config
+
+    def property_names(self) -> frozenset:
+        self.config()
+        return self._properties
+
+    def has_property(self, name: str) -> bool:
+        return name in self.property_names()
+
+    def invalidate(self):
+        with self._lock:
+            self._config = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+# collection name -> cache shared by every WeaviateUtils on that collection in this process
+_CACHES = {}
+
+
+def collection_meta(collection, ttl: float = DEFAULT_META_TTL) -> CollectionMetaCache:
+    cache = _CACHES.get(collection.name)
+    if cache is None:
+        cache = _CACHES[collection.name] = CollectionMetaCache(collection, ttl)
+    else:
+        # Keep the newest handle; the old one may belong to a recreated collection.
+        cache.collection = collection
+    return cache
+
+
+def invalidate_collection_meta(name: str):
+    cache = _CACHES.get(name)
+    if cache is not None:
+        cache.invalidate()
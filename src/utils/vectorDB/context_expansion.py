@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from weaviate.classes.query import Filter
+
+# Upper bound on objects a single fetch_objects call asks for (Weaviate's default
+# QUERY_MAXIMUM_RESULTS is 10000); windows beyond it go into further queries.
+MAX_OBJECTS_PER_QUERY = 2000
+# IDs per Filter.by_id().contains_any lookup.
+MAX_IDS_PER_QUERY = 500
+
+
+def merge_windows(hits: Iterable[Tuple[str, int]], index_range: int) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Turn (source, chunk_index) hits into per-source [start, end] chunk windows of +-index_range,
+    merging windows of the same source that overlap or touch. Sources keep their first-hit order.
+    """
+    spans = {}
+    for source, index in hits:
+        spans.setdefault(source, []).append((max(index - index_range, 0), index + index_range))
+    windows = {}
+    for source, source_spans in spans.items():
+        merged = []
+        for start, end in sorted(source_spans):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        windows[source] = merged
+    return windows
+
+
+def window_filter(source: str, start: int, end: int):
+    return (
+        Filter.by_property("source").equal(source)
+        & Filter.by_property("chunk_index").greater_or_equal(start)
+        & Filter.by_property("chunk_index").less_or_equal(end)
+    )
+
+
+class ContextExpander:
+    """
+    Fetches the neighbour chunks of many hits with as few round-trips as possible.
+
+    All merged windows are OR-ed into one fetch_objects filter; when there are more than
+    max_clauses windows (or more objects than MAX_OBJECTS_PER_QUERY) they are split into
+    several such queries, sent max_concurrent at a time.
+    """
+
+    def __init__(self, collection, max_clauses: int = 25, max_concurrent: int = 4):
+        self.collection = collection
+        self.max_clauses = max_clauses
+        self.max_concurrent = max_concurrent
+        self.queries = 0
+
+    def _groups(self, windows: Dict[str, List[Tuple[int, int]]]):
+        group, size = [], 0
+        for source, spans in windows.items():
+            for start, end in spans:
+                span_size = end - start + 1
+                if group and (len(group) >= self.max_clauses or size + span_size > MAX_OBJECTS_PER_QUERY):
+                    yield group, size
+                    group, size = [], 0
+                group.append((source, start, end))
+                size += span_size
+        if group:
+            yield group, size
+
+    def _fetch(self, group, size, return_properties):
+        filters = [window_filter(source, start, end) for source, start, end in group]
+        response = self.collection.query.fetch_objects(
+            filters=filters[0] if len(filters) == 1 else Filter.any_of(filters),
+            return_properties=return_properties,
+            limit=size,
+        )
+        return response.objects
+
+    def expand(self, hits: List[Tuple[str, int]], index_range: int, return_properties: List[str],
+               limit_per_source: int = None) -> Dict[str, list]:
+        """
+        Neighbour chunks per source for (source, chunk_index) hits, sorted by chunk_index.
+        :param limit_per_source: Keep at most this many chunks per source, the ones closest to a hit.
+        """
+        hits = list(hits)
+        windows = merge_windows(hits, index_range)
+        groups = list(self._groups(windows))
+        self.queries += len(groups)
+        if len(groups) == 1 or self.max_concurrent <= 1:
+            results = [self._fetch(group, size, return_properties) for group, size in groups]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(groups))) as pool:
+                results = list(pool.map(lambda g: self._fetch(g[0], g[1], return_properties), groups))
+
+        by_source = {source: [] for source in windows}
+        for objects in results:
+            for obj in objects:
+                by_source.setdefault(obj.properties["source"], []).append(obj)
+        return _select(by_source, hits, limit_per_source)
+
+    def _fetch_ids(self, ids, return_properties):
+        objects = []
+        for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+            part = ids[i:i + MAX_IDS_PER_QUERY]
+            response = self.collection.query.fetch_objects(
+                filters=Filter.by_id().contains_any(part),
+                return_properties=return_properties,
+                limit=len(part),
+            )
+            self.queries += 1
+            objects.extend(response.objects)
+        return objects
+
+    def expand_by_links(self, hit_objects: list, index_range: int, return_properties: List[str],
+                        limit_per_source: int = None) -> Dict[str, list]:
+        """
+        Like expand, but walks the prev_id / next_id links stored at ingest: one ID lookup per hop
+        for all hits together, index_range hops, and no filtered scan over source / chunk_index.
+        ``hit_objects`` need prev_id / next_id; the hits themselves are re-read with return_properties
+        in the first lookup. Windows of the same source share visited IDs, so overlaps merge.
+        """
+        props = list(dict.fromkeys(list(return_properties) + ["prev_id", "next_id"]))
+        pending = {str(obj.uuid) for obj in hit_objects}
+        backward, forward = set(), set()
+        if index_range > 0:
+            backward = {str(obj.properties["prev_id"]) for obj in hit_objects if obj.properties.get("prev_id")}
+            forward = {str(obj.properties["next_id"]) for obj in hit_objects if obj.properties.get("next_id")}
+        seen, by_source = set(), {}
+        for _ in range(max(index_range, 1)):
+            ids = (pending | backward | forward) - seen
+            if not ids:
+                break
+            objects = self._fetch_ids(sorted(ids), props)
+            seen |= ids
+            pending, next_backward, next_forward = set(), set(), set()
+            for obj in objects:
+                by_source.setdefault(obj.properties["source"], []).append(obj)
+                uuid = str(obj.uuid)
+                if uuid in backward and obj.properties.get("prev_id"):
+                    next_backward.add(str(obj.properties["prev_id"]))
+                if uuid in forward and obj.properties.get("next_id"):
+                    next_forward.add(str(obj.properties["next_id"]))
+            backward, forward = next_backward, next_forward
+        hits = [(obj.properties["source"], obj.properties["chunk_index"]) for obj in hit_objects]
+        return _select(by_source, hits, limit_per_source)
+
+
+def _select(by_source: Dict[str, list], hits, limit_per_source: int = None) -> Dict[str, list]:
+    """Sort each source's chunks by chunk_index, keeping at most limit_per_source closest to a hit."""
+    hit_indexes = {}
+    for source, index in hits:
+        hit_indexes.setdefault(source, []).append(index)
+    for source, objects in by_source.items():
+        if limit_per_source and len(objects) > limit_per_source:
+            indexes = hit_indexes.get(source, [0])
+            objects = sorted(
+                objects, key=lambda o: min(abs(o.properties["chunk_index"] - i) for i in indexes)
+            )[:limit_per_source]
+        by_source[source] = sorted(objects, key=lambda o: o.properties["chunk_index"])
+    return by_source
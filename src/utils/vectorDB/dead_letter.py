@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, List
+
+from src.utils.logger_config import logger
+from src.utils.vectorDB.batch_ingest import BatchIngestor, FailedObject
+from src.utils.vectorDB.query_cache import bump_generation
+
+DEFAULT_DEAD_LETTER_PATH = "dead_letter.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failed_objects (
+    collection TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    first_failed_at TEXT NOT NULL,
+    last_failed_at TEXT NOT NULL,
+    PRIMARY KEY (collection, uuid)
+)
+"""
+
+
+class DeadLetterStore:
+    """SQLite store of objects that could not be inserted, keyed by (collection, uuid)."""
+
+    def __init__(self, path=DEFAULT_DEAD_LETTER_PATH):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        with self.conn:
+            self.conn.execute(_SCHEMA)
+
+    def add(self, collection: str, failures: Iterable[FailedObject]) -> int:
+        """Record failed objects; an object failing again keeps its row and bumps ``attempts``."""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (collection, f.uuid, json.dumps(f.properties, ensure_ascii=False, default=str), f.error, now, now)
+            for f in failures
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO failed_objects (collection, uuid, properties, error, first_failed_at, last_failed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (collection, uuid) DO UPDATE SET
+                    properties = excluded.properties,
+                    error = excluded.error,
+                    attempts = attempts + 1,
+                    last_failed_at = excluded.last_failed_at
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def collections(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT collection FROM failed_objects ORDER BY 1")]
+
+    def pending(self, collection: str) -> Iterator[tuple]:
+        """Yield (properties, uuid) of the dead-lettered objects of a collection."""
+        cursor = self.conn.execute(
+            "SELECT properties, uuid FROM failed_objects WHERE collection = ? ORDER BY first_failed_at", (collection,)
+        )
+        for properties, uuid in cursor.fetchall():
+            yield json.loads(properties), uuid
+
+    def remove(self, collection: str, uuids: Iterable[str]):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM failed_objects WHERE collection = ? AND uuid = ?",
+                [(collection, uuid) for uuid in uuids],
+            )
+
+    def count(self, collection: str = None) -> int:
+        if collection is None:
+            return self.conn.execute("SELECT COUNT(*) FROM failed_objects").fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM failed_objects WHERE collection = ?", (collection,)
+        ).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def replay_dead_letters(client, store: DeadLetterStore, collections: List[str] = None, rounds: int = 3,
+                        backoff: float = 5.0, batch_size: int = 100, concurrent_requests: int = 2) -> dict:
+    """
+    Re-send dead-lettered objects with their original UUIDs and properties.
+    Objects that go through are removed from the store; the rest stay with their latest error.
+    Each collection gets up to ``rounds`` passes, waiting ``backoff`` seconds (doubling) in between.
+    :returns: {collection: InsertResult.summary() of the last pass, plus "remaining"}
+    """
+    summary = {}
+    for name in collections or store.collections():
+        ingestor = BatchIngestor(
+            client.collections.get(name), batch_size=batch_size, concurrent_requests=concurrent_requests
+        )
+        totals = {"inserted": 0, "failed": 0, "retried": 0}
+        for attempt in range(rounds):
+            objects = list(store.pending(name))
+            if not objects:
+                break
+            if attempt:
+                delay = backoff * 2 ** (attempt - 1)
+                logger.info(f"Replaying {len(objects)} dead-lettered objects of {name} in {delay:.0f}s")
+                time.sleep(delay)
+            result = ingestor.ingest(objects)
+            bump_generation(name)
+            still_failing = {f.uuid for f in result.failures}
+            store.remove(name, [str(uuid) for _, uuid in objects if str(uuid) not in still_failing])
+            store.add(name, result.failures)
+            totals["inserted"] += result.inserted
+            totals["retried"] += result.retried
+            totals["failed"] = result.failed
+        summary[name] = {**totals, "remaining": store.count(name)}
+        print(f"🔁 Dead-letter replay {name}: {summary[name]}")
+    return summary
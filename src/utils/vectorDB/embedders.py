@@ -0,0 +1,125 @@
+import hashlib
+import os
+import time
+from typing import List
+
+import httpx
+import numpy as np
+
+from src.utils.logger_config import logger
+
+# Output dimensions of the OpenAI embedding models used by text2vec_openai collections.
+OPENAI_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def _camel_case_to_lower(name: str) -> str:
+    """Weaviate's camelCaseToLower: split into case / digit / other runs ("PDFLoader" -> PDF, Loader), lower-case, join with spaces."""
+    runs = []
+    for char in name:
+        kind = "lower" if char.islower() else "upper" if char.isupper() else "digit" if char.isdigit() else "other"
+        if runs and runs[-1][0] == kind:
+            runs[-1][1] += char
+        else:
+            runs.append([kind, char])
+    for current, following in zip(runs, runs[1:]):
+        if current[0] == "upper" and following[0] == "lower":
+            following[1] = current[1][-1] + following[1]
+            current[1] = current[1][:-1]
+    return " ".join(text.lower() for _, text in runs if text and text != " ")
+
+
+def vectorizer_input_prefix(config, vector_name: str = "text_vector", prop: str = "content") -> str:
+    """
+    Text a text2vec module puts in front of a property's value before embedding it: the collection
+    name (vectorizeClassName) and the property name (vectorizePropertyName), as configured on the
+    collection. Empty for collections created by WeaviateController, which disable both.
+    :param config: ``collection.config.get()``.
+    """
+    named = (config.vector_config or {}).get(vector_name)
+    if named is None:
+        return ""
+    module = getattr(named.vectorizer.vectorizer, "value", named.vectorizer.vectorizer)
+    parts = []
+    if named.vectorizer.model.get("vectorizeClassName", True):
+        parts.append(_camel_case_to_lower(config.name))
+    for stored in config.properties:
+        if stored.name == prop:
+            settings = (stored.vectorizer_configs or {}).get(module) or stored.vectorizer_config
+            if settings is not None and settings.vectorize_property_name:
+                parts.append(_camel_case_to_lower(prop))
+    return "".join(part + " " for part in parts)
+
+
+class OpenAIEmbedder:
+    """
+    Embeds texts with the OpenAI embeddings API. For the same input text these are the vectors
+    text2vec_openai computes; the server's input is the content, plus the collection / property
+    name when the collection is configured to vectorize them (see vectorizer_input_prefix).
+    """
+
+    url = "https://api.openai.com/v1/embeddings"
+
+    def __init__(self, model: str = "text-embedding-3-small", api_key: str = None, batch_size: int = 256,
+                 timeout: float = 60.0, max_retries: int = 5, backoff: float = 2.0):
+        """
+        :param batch_size: Texts per API request.
+        :param max_retries: Retries on 429 / 5xx, with exponential backoff.
+        """
+        self.model = model
+        self.dim = OPENAI_DIMENSIONS.get(model)
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.client = httpx.Client(
+            timeout=timeout,
+            headers={"Authorization": f"Bearer {api_key or os.environ['OPENAI_API_KEY']}"},
+        )
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            response = self.client.post(self.url, json={"model": self.model, "input": texts})
+            if response.status_code in (429, 500, 502, 503, 504) and attempt < self.max_retries:
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"⚠️ Embeddings API returned {response.status_code}; retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda item: item["index"])
+            return [item["embedding"] for item in data]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._request(texts[i:i + self.batch_size]))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def close(self):
+        self.client.close()
+
+
+class FakeEmbedder:
+    """
+    Deterministic, offline embedder for tests and benchmarks: the vector is a unit-length
+    pseudo-random projection seeded by the text's hash. Not comparable with real model vectors.
+    """
+
+    def __init__(self, dim: int = 64, model: str = "fake-embedding"):
+        self.model = model
+        self.dim = dim
+        self.calls = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self.calls += 1
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim)
+            vectors[row] = vector / np.linalg.norm(vector)
+        return vectors
+
+    def close(self):
+        pass
@@ -0,0 +1,182 @@
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.utils.vectorDB.chunk_diff import content_hash
+
+# Rows added to the vector file each time it grows.
+_GROWTH_ROWS = 4096
+
+
+class EmbeddingCache:
+    """
+    On-disk vectors of one embedding model, keyed by content hash.
+
+    Vectors live in a single memory-mapped array file (float16 by default, half the size of
+    float32 at ~1e-3 relative error); ``index.sqlite3`` maps content hash -> row.
+    Layout: ``<cache_dir>/<model>/vectors.<dtype>`` and ``<cache_dir>/<model>/index.sqlite3``.
+    Several processes may share cache_dir: rows are allocated inside a write transaction on the index.
+    """
+
+    def __init__(self, cache_dir, model: str, dim: int = None, dtype: str = "float16"):
+        """
+        :param dim: Vector size; read from the index when the cache already exists, else taken from the first put.
+        """
+        self.model = model
+        self.dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9._-]", "_", model)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        # Lookups may run in a worker thread (async ingestion); CachedEmbedder serializes them.
+        # Processes sharing cache_dir serialize row allocation through the index (see put_many).
+        self.conn = sqlite3.connect(self.dir / "index.sqlite3", timeout=60, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.dim = int(meta["dim"]) if "dim" in meta else dim
+        self.rows = self._next_row()
+        self.path = self.dir / f"vectors.{self.dtype.name}"
+        self._data = None
+        self.hits = 0
+        self.misses = 0
+
+    def _next_row(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+
+    def _capacity(self) -> int:
+        if not self.path.exists() or not self.dim:
+            return 0
+        return self.path.stat().st_size // (self.dim * self.dtype.itemsize)
+
+    def _map(self, min_rows: int = 0):
+        """(Re)map the vector file, growing it to hold at least min_rows rows."""
+        capacity = self._capacity()
+        if min_rows > capacity:
+            capacity = max(min_rows, capacity + _GROWTH_ROWS)
+            with open(self.path, "ab") as f:
+                f.truncate(capacity * self.dim * self.dtype.itemsize)
+        if self._data is not None and len(self._data) < capacity:
+            # The file grew (here or in another process sharing the cache).
+            self._data.flush()
+            self._data = None
+        if self._data is None and capacity:
+            self._data = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        return self._data
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Cached float32 vectors for the given hashes; missing ones are absent from the result."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            found.update(self.conn.execute(
+                f"SELECT hash, row FROM vectors WHERE hash IN ({','.join('?' * len(part))})", part
+            ))
+        # Rows written by another process may lie beyond the current mapping.
+        data = self._map(max(found.values()) + 1) if found else None
+        return {h: np.asarray(data[row], dtype=np.float32) for h, row in found.items()}
+
+    def put_many(self, hashes: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors)
+        if not len(hashes):
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector size {vectors.shape[1]} does not match cache dimension {self.dim}")
+        new = {}
+        for h, vector in zip(hashes, vectors):
+            if h not in new:
+                new[h] = vector
+        with self.conn:
+            # Takes the index's write lock, so processes sharing the cache never hand out the same rows.
+            self.conn.execute("BEGIN IMMEDIATE")
+            known = set()
+            hashes = list(new)
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                known.update(h for (h,) in self.conn.execute(
+                    f"SELECT hash FROM vectors WHERE hash IN ({','.join('?' * len(part))})", part
+                ))
+            new = {h: v for h, v in new.items() if h not in known}
+            if not new:
+                return
+            start = self._next_row()
+            data = self._map(start + len(new))
+            # Vectors are on disk before the index points at them.
+            data[start:start + len(new)] = np.stack(list(new.values())).astype(self.dtype)
+            data.flush()
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?), ('dtype', ?)", (str(self.dim), self.dtype.name))
+            self.conn.executemany(
+                "INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                [(h, start + i) for i, h in enumerate(new)],
+            )
+        self.rows = start + len(new)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "vectors": self.rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "bytes": self.rows * (self.dim or 0) * self.dtype.itemsize,
+        }
+
+    def close(self):
+        if self._data is not None:
+            self._data.flush()
+            self._data = None
+        self.conn.close()
+
+
+class CachedEmbedder:
+    """Embedder front-end that only sends texts whose (model, content hash) is not cached yet."""
+
+    def __init__(self, embedder, cache: EmbeddingCache, input_prefix: str = ""):
+        """
+        :param input_prefix: Put in front of every text before hashing / embedding it, so vectors match
+            what the server's vectorizer embeds (see embedders.vectorizer_input_prefix).
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.input_prefix = input_prefix
+        self.model = embedder.model
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            return self._embed(texts)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.cache.dim or 0), dtype=np.float32)
+        if self.input_prefix:
+            texts = [self.input_prefix + text for text in texts]
+        hashes = [content_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes)
+        missing = [h for h in hashes if h not in cached]
+        self.cache.hits += len(hashes) - len(missing)
+        self.cache.misses += len(missing)
+        missing = list(dict.fromkeys(missing))
+        if missing:
+            first_text = {}
+            for h, text in zip(hashes, texts):
+                first_text.setdefault(h, text)
+            start = time.perf_counter()
+            vectors = self.embedder.embed([first_text[h] for h in missing])
+            self.seconds += time.perf_counter() - start
+            self.cache.put_many(missing, vectors)
+            cached.update(zip(missing, np.asarray(vectors, dtype=np.float32)))
+        return np.stack([cached[h] for h in hashes])
+
+    def close(self):
+        self.embedder.close()
+        self.cache.close()
@@ -0,0 +1,55 @@
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List
+
+from weaviate.util import generate_uuid5
+
+# Properties added to each chunk after its UUID is generated, so UUIDs stay the same as before.
+LINK_PROPERTIES = ("prev_id", "next_id", "chunk_count")
+
+
+def chunk_properties(content, source, level, origin, chunk_index) -> dict:
+    """Base properties of a chunk, in the order its UUID is generated from."""
+    return {"content": content, "source": source, "level": level, "origin": origin, "chunk_index": chunk_index}
+
+
+def neighbour_links(uuids_by_index: Dict[int, str]) -> Dict[int, dict]:
+    """prev_id / next_id / chunk_count for every chunk of one source, given its chunk_index -> UUID map."""
+    order = sorted(uuids_by_index)
+    links = {}
+    for position, index in enumerate(order):
+        links[index] = {
+            "prev_id": uuids_by_index[order[position - 1]] if position else None,
+            "next_id": uuids_by_index[order[position + 1]] if position + 1 < len(order) else None,
+            "chunk_count": len(order),
+        }
+    return links
+
+
+def links_for_rows(sources: List, chunk_indexes: List, uuids: List[str]) -> List[dict]:
+    """Links for aligned rows, treating all rows of a source as that source's complete chunk set."""
+    by_source = {}
+    for source, index, uuid in zip(sources, chunk_indexes, uuids):
+        by_source.setdefault(source, {})[index] = uuid
+    links = {source: neighbour_links(uuids_by_index) for source, uuids_by_index in by_source.items()}
+    return [links[source][index] for source, index in zip(sources, chunk_indexes)]
+
+
+def document_links(source, contents: List[str], chunk_indexes: List[int], level, origin) -> List[dict]:
+    """Links for one document's chunks, aligned with contents."""
+    uuids = [
+        generate_uuid5(chunk_properties(content, source, level, origin, index))
+        for content, index in zip(contents, chunk_indexes)
+    ]
+    return links_for_rows([source] * len(uuids), chunk_indexes, uuids)
+
+
+def with_links(records: Iterable[tuple], level, origin) -> Iterator[tuple]:
+    """
+    Extend (source, chunk_index, text) records, which arrive document by document, to
+    (source, chunk_index, text, links). Holds one document's records at a time.
+    """
+    for source, group in groupby(records, key=lambda record: record[0]):
+        group = list(group)
+        links = document_links(source, [r[2] for r in group], [r[1] for r in group], level, origin)
+        for (_, index, text), link in zip(group, links):
+            yield source, index, text, link
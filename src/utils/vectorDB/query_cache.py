@@ -0,0 +1,97 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from src.utils.pipeline_metrics import observe_query_cache
+
+# collection name -> write generation; bumped by every insert / update / delete in this process.
+# Writes by other processes (main.py tasks, dead-letter replay) are not seen: only the TTL bounds those.
+_generations = defaultdict(int)
+_generations_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def collection_generation(name: str) -> int:
+    return _generations[name]
+
+
+def bump_generation(name: str):
+    """Invalidate cached query results of a collection after its objects changed."""
+    with _generations_lock:
+        _generations[name] += 1
+
+
+def normalize_query(text: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query."""
+    return _WHITESPACE.sub(" ", text or "").strip().strip("?!.").strip().lower()
+
+
+class QueryResultCache:
+    """
+    LRU cache of query results with a TTL, tied to collection write generations.
+
+    An entry is only served while its collection's generation is unchanged (nothing was
+    ingested or deleted in this process since) and it is younger than ttl seconds.
+    Generations live in process memory, so writes made by another process (an ingest task,
+    dead-letter replay) are only picked up once the entry expires: ttl is the staleness bound
+    for those, hence the short default. Values are deep-copied in and out, so callers may
+    modify what they get.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (generation, stored_at, value, seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def get(self, key, generation: int):
+        """Cached value for key, or None; counts the hit / miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != generation or time.monotonic() - entry[1] >= self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                observe_query_cache(hit=False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # A hit saves roughly what the original query took.
+            self.seconds_saved += entry[3]
+            observe_query_cache(hit=True, saved_seconds=entry[3])
+            value = entry[2]
+        return copy.deepcopy(value)
+
+    def put(self, key, generation: int, value, seconds: float):
+        """Store a result that took ``seconds`` to compute."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), value, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+# Shared by every WeaviateUtils in the process, so tasks on the same collection reuse results.
+QUERY_CACHE = QueryResultCache()
@@ -1,11 +1,18 @@
 from weaviate.classes.query import MetadataQuery, Filter
 import json
+import time
 from typing import Dict
 from weaviate.classes.query import HybridFusion
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import weaviate.classes as wvc
 from weaviate.util import generate_uuid5  # Generate a deterministic ID
+from src.utils.vectorDB.batch_ingest import BatchIngestor, FailedObject, InsertResult
+from src.utils.vectorDB.chunk_diff import StoredChunk, content_hash, diff_chunks
+from src.utils.vectorDB.collection_meta import collection_meta
+from src.utils.vectorDB.context_expansion import ContextExpander, merge_windows
+from src.utils.vectorDB.neighbour_links import LINK_PROPERTIES, chunk_properties, links_for_rows, neighbour_links
+from src.utils.vectorDB.query_cache import QUERY_CACHE, bump_generation, collection_generation, normalize_query
 class Source(BaseModel):
     """Source information for guideline responses"""
 
@@ -15,36 +22,320 @@ class Source(BaseModel):
         None, description="Relevance score from vector search"
     )
 
+def _stored_links(properties) -> dict:
+    """prev_id / next_id / chunk_count of a fetched object, with UUIDs as strings."""
+    return {
+        "prev_id": str(properties["prev_id"]) if properties.get("prev_id") else None,
+        "next_id": str(properties["next_id"]) if properties.get("next_id") else None,
+        "chunk_count": properties.get("chunk_count"),
+    }
+
+
 class WeaviateUtils:
-    def __init__(self, collection):
+    def __init__(self, collection, metrics=None, batch_size: int = 100, concurrent_requests: int = 2,
+                 max_retries: int = 3, skip_existing: bool = False, follow_links: bool = False):
+        """
+        :param metrics: Optional PipelineMetrics receiving uuid_generation / insert timings.
+        :param batch_size: Objects per batch request.
+        :param concurrent_requests: Batch requests in flight at once.
+        :param max_retries: Retry rounds for objects rejected with a rate-limit / timeout error.
+        :param skip_existing: Drop objects whose UUID is already stored before embedding / inserting them.
+            Off by default, as it costs an ID lookup per batch; tasks re-ingesting into a populated collection opt in.
+        :param follow_links: Expand search hits by walking their prev_id / next_id links (one ID lookup
+            per hop) instead of the combined source / chunk_index window query.
+        """
         self.collection = collection
-    def insert_data(self, **kwargs):
-        """Insert a list of objects where each object = {'properties': {...}, 'uuid': ...}."""
+        # Cached collection config (property names etc.), shared per collection.
+        self.meta = collection_meta(collection)
+        self.context_expander = ContextExpander(collection)
+        self.metrics = metrics
+        self.skip_existing = skip_existing
+        self.follow_links = follow_links
+        # Optional DeadLetterStore keeping objects the ingestor gave up on, for replay.
+        self.dead_letter = None
+        # Optional CachedEmbedder; when set, vectors are computed client-side and sent with the objects.
+        self.embedder = None
+        # Seconds spent in embedding / existence checks during the current insert_data call.
+        self._phase_seconds = {}
+        self.ingestor = BatchIngestor(
+            collection,
+            batch_size=batch_size,
+            concurrent_requests=concurrent_requests,
+            max_retries=max_retries,
+        )
+    @property
+    def links_enabled(self) -> bool:
+        """Whether the collection has the neighbour-link properties (see WeaviateController.migrate_link_properties)."""
+        return all(self.meta.has_property(name) for name in LINK_PROPERTIES)
+
+    def insert_data(self, links=None, **kwargs) -> InsertResult:
+        """
+        Insert aligned property lists (content=[...], source=[...], ...) through the batch ingestor.
+        Objects are built one row at a time with a UUID derived from their properties.
+        :param links: Per-row prev_id / next_id / chunk_count, added after the UUID is generated.
+            By default they are derived from the lists, which then must hold complete documents.
+            Ignored for collections without the link properties.
+        """
         try:
             # Validate lengths of remaining fields
             lengths = {len(v) for v in kwargs.values()}
             if len(lengths) != 1:
                 raise ValueError("All property lists must have the same length.")
-            data_objects = []
-            for i, vals in enumerate(zip(*kwargs.values())):
-                # Build the properties dict from each row of values
-                properties = dict(zip(kwargs.keys(), vals))
-                # Create the object with the UUID
-                obj = wvc.data.DataObject(
-                    properties=properties,
-                    uuid=generate_uuid5(properties),  
-                )
-                data_objects.append(obj)
-            print(f"📥 Inserting {len(data_objects)} items...")
-            response = self.collection.data.insert_many(data_objects)
+            count = lengths.pop()
+            start = time.perf_counter()
+            uuids = [generate_uuid5(dict(zip(kwargs.keys(), vals))) for vals in zip(*kwargs.values())]
+            uuid_seconds = time.perf_counter() - start
+            if not self.links_enabled:
+                links = None
+            elif links is None and "source" in kwargs and "chunk_index" in kwargs:
+                links = links_for_rows(kwargs["source"], kwargs["chunk_index"], uuids)
 
-            if response.has_errors:
-                print("❌ Insert Errors:", response.errors)
+            def objects():
+                for row, (vals, uuid) in enumerate(zip(zip(*kwargs.values()), uuids)):
+                    # Build the properties dict from each row of values
+                    properties = dict(zip(kwargs.keys(), vals))
+                    if links is not None and links[row]:
+                        properties.update(links[row])
+                    yield properties, uuid
+
+            def with_vectors(rows, embed_batch=256):
+                """Attach client-side "text_vector" embeddings, one embedder call per embed_batch rows."""
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= embed_batch:
+                        yield from self._embed_rows(batch)
+                        batch = []
+                yield from self._embed_rows(batch)
+
+            sources = kwargs.get("source", ())
+            print(f"📥 Inserting {count} items...")
+            self._phase_seconds = {"embedding": 0.0, "existence_check": 0.0}
+            skipped = [0]
+            start = time.perf_counter()
+            rows = self._drop_existing(objects(), skipped) if self.skip_existing else objects()
+            try:
+                result = self.ingestor.ingest(with_vectors(rows) if self.embedder else rows)
+            finally:
+                bump_generation(self.collection.name)
+            result.skipped = skipped[0]
+            if self.metrics:
+                self.metrics.record_batch("uuid_generation", uuid_seconds, count, sources)
+                insert_seconds = time.perf_counter() - start - sum(self._phase_seconds.values())
+                self.metrics.record_batch("insert", insert_seconds, count, sources)
+
+            if result.failed:
+                print(f"❌ Insert Errors: {result.summary()}")
+                for failure in result.failures[:5]:
+                    print(f"   {failure.uuid}: {failure.error}")
+                if self.dead_letter is not None:
+                    self.dead_letter.add(self.collection.name, result.failures)
+                    print(f"   {result.failed} failed objects saved to {self.dead_letter.path} for replay.")
             else:
-                print("✅ Insert complete.")
+                print(f"✅ Insert complete. {result.summary()}")
+            if self.embedder:
+                print(f"🧮 Embedding cache: {self.embedder.cache.stats()}")
+            return result
         except Exception as e:
             print(f"❌ Error: {e}")
-            return {"error": str(e)}
+            # Every row counts as failed (and is kept for replay), so callers don't record its source as done.
+            failures = self._failed_rows(kwargs, links, f"{type(e).__name__}: {e}")
+            if failures and self.dead_letter is not None:
+                self.dead_letter.add(self.collection.name, failures)
+                print(f"   {len(failures)} objects saved to {self.dead_letter.path} for replay.")
+            return InsertResult(failed=len(failures), failures=failures)
+
+    @staticmethod
+    def _failed_rows(kwargs, links, error: str) -> List[FailedObject]:
+        failures = []
+        for row, vals in enumerate(zip(*kwargs.values())):
+            properties = dict(zip(kwargs.keys(), vals))
+            uuid = generate_uuid5(properties)
+            if links is not None and row < len(links) and links[row]:
+                properties.update(links[row])
+            failures.append(FailedObject(uuid=str(uuid), properties=properties, error=error))
+        return failures
+    def existing_ids(self, uuids) -> set:
+        """The subset of uuids already stored in the collection (one query per call)."""
+        response = self.collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(list(uuids)),
+            return_properties=[],
+            limit=len(uuids),
+        )
+        return {str(obj.uuid) for obj in response.objects}
+
+    def _drop_existing(self, rows, skipped, check_batch: int = 500):
+        """Filter (properties, uuid) rows down to UUIDs not stored yet, checking check_batch at a time."""
+        batch = []
+
+        def flush():
+            start = time.perf_counter()
+            existing = self.existing_ids([uuid for _, uuid in batch])
+            seconds = time.perf_counter() - start
+            self._phase_seconds["existence_check"] += seconds
+            if self.metrics:
+                self.metrics.record_batch("existence_check", seconds, len(batch))
+            skipped[0] += len(existing)
+            return [row for row in batch if row[1] not in existing]
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= check_batch:
+                yield from flush()
+                batch = []
+        if batch:
+            yield from flush()
+
+    def _embed_rows(self, rows):
+        if not rows:
+            return
+        start = time.perf_counter()
+        vectors = self.embedder.embed([properties["content"] for properties, _ in rows])
+        seconds = time.perf_counter() - start
+        self._phase_seconds["embedding"] += seconds
+        if self.metrics:
+            self.metrics.record_batch("embedding", seconds, len(rows))
+        for (properties, uuid), vector in zip(rows, vectors):
+            yield properties, uuid, {"text_vector": vector.tolist()}
+
+    def fetch_source_chunks(self, source: str, page_size: int = 1000) -> List[StoredChunk]:
+        """All chunks stored for one source, with content hashes instead of content."""
+        stored, offset = [], 0
+        link_props = [name for name in LINK_PROPERTIES if self.meta.has_property(name)]
+        while True:
+            response = self.collection.query.fetch_objects(
+                filters=Filter.by_property("source").equal(source),
+                return_properties=["content", "chunk_index", "level", "origin"] + link_props,
+                limit=page_size,
+                offset=offset,
+            )
+            for obj in response.objects:
+                stored.append(StoredChunk(
+                    uuid=str(obj.uuid),
+                    content_hash=content_hash(obj.properties.get("content") or ""),
+                    chunk_index=obj.properties.get("chunk_index"),
+                    level=obj.properties.get("level"),
+                    origin=obj.properties.get("origin"),
+                    links=_stored_links(obj.properties) if link_props else None,
+                ))
+            if len(response.objects) < page_size:
+                return stored
+            offset += page_size
+
+    def delete_by_ids(self, uuids, batch_size: int = 500) -> int:
+        """Delete objects by UUID; returns the number deleted."""
+        deleted = 0
+        for i in range(0, len(uuids), batch_size):
+            result = self.collection.data.delete_many(
+                where=Filter.by_id().contains_any(uuids[i:i + batch_size])
+            )
+            deleted += result.successful
+            if result.failed:
+                print(f"❌ Failed to delete {result.failed} objects")
+        bump_generation(self.collection.name)
+        return deleted
+
+    def sync_source(self, source: str, content, chunk_index, level, origin) -> dict:
+        """
+        Bring the stored chunks of one source in line with a new chunk set, touching only what changed.
+        Chunks already stored under their UUID are kept; stored content whose chunk_index (or level /
+        origin) changed is moved to its new UUID with the stored vector, so nothing is re-embedded.
+        Only new contents are inserted (and embedded), vanished ones deleted.
+        """
+        start = time.perf_counter()
+        stored = self.fetch_source_chunks(source)
+        diff = diff_chunks(stored, content, chunk_index, source, level, origin)
+        if self.links_enabled:
+            links = neighbour_links(diff.kept)
+            self._relink(diff, stored, links)
+        else:
+            links = {index: None for index in diff.kept}
+        failed = 0
+        if diff.move:
+            failed += self._move_chunks(diff.move, source, level, origin, links)
+        if diff.delete:
+            self.delete_by_ids(diff.delete)
+        for uuid, changes in diff.update:
+            # Only link properties change, so the stored vector is kept.
+            self.collection.data.update(uuid=uuid, properties=changes)
+        if diff.update:
+            bump_generation(self.collection.name)
+        if diff.insert:
+            indexes, contents = (list(col) for col in zip(*diff.insert))
+            # Same property order as a full insert, so generated UUIDs match.
+            failed += self.insert_data(
+                content=contents,
+                source=[source] * len(contents),
+                level=[level] * len(contents),
+                origin=[origin] * len(contents),
+                chunk_index=indexes,
+                links=[links[index] for index in indexes],
+            ).failed
+        summary = dict(diff.summary(), failed=failed)
+        if self.metrics:
+            self.metrics.record_batch("sync", time.perf_counter() - start, len(content), [source])
+        print(f"🔄 {source}: {summary}")
+        return summary
+
+    def fetch_vectors(self, uuids, batch_size: int = 500) -> dict:
+        """Stored vectors by UUID (as returned with include_vector=True)."""
+        vectors = {}
+        for i in range(0, len(uuids), batch_size):
+            part = uuids[i:i + batch_size]
+            response = self.collection.query.fetch_objects(
+                filters=Filter.by_id().contains_any(part),
+                return_properties=[],
+                include_vector=True,
+                limit=len(part),
+            )
+            vectors.update({str(obj.uuid): obj.vector or None for obj in response.objects})
+        return vectors
+
+    def _move_chunks(self, moves, source, level, origin, links) -> int:
+        """
+        Re-insert stored chunks under the UUID of their new chunk_index / level / origin, reusing
+        their vectors, then delete the old objects. Returns the number of chunks that failed to move;
+        their old objects are left in place.
+        """
+        vectors = self.fetch_vectors([old for old, _, _ in moves])
+        rows, missing, old_by_uuid = [], [], {}
+        for old, index, text in moves:
+            properties = chunk_properties(text, source, level, origin, index)
+            uuid = generate_uuid5(properties)
+            old_by_uuid[str(uuid)] = old
+            if links[index]:
+                properties.update(links[index])
+            if vectors.get(old):
+                rows.append((properties, uuid, vectors[old]))
+            else:
+                missing.append((properties, uuid))
+        if missing and self.embedder:
+            rows.extend(self._embed_rows(missing))
+        else:
+            # Without a stored vector (or a client-side embedder) the server vectorizes the object again.
+            rows.extend(missing)
+        try:
+            result = self.ingestor.ingest(rows)
+        finally:
+            bump_generation(self.collection.name)
+        if result.failures and self.dead_letter is not None:
+            self.dead_letter.add(self.collection.name, result.failures)
+        failed = {failure.uuid for failure in result.failures}
+        moved = [old for uuid, old in old_by_uuid.items() if uuid not in failed]
+        if moved:
+            self.delete_by_ids(moved)
+        return len(failed)
+
+    @staticmethod
+    def _relink(diff, stored, links):
+        """Add neighbour-link changes of chunks kept as is to diff.update."""
+        stored_links = {chunk.uuid: chunk.links for chunk in stored}
+        for index, uuid in diff.kept.items():
+            if uuid not in stored_links or stored_links[uuid] == links[index]:
+                continue
+            diff.unchanged -= 1
+            diff.update.append((uuid, links[index]))
+
     def insert_data_new(self, content, source, level, origin, chunk_index):
         """
         Insert data into Weaviate using separate lists:
@@ -85,6 +376,7 @@ class WeaviateUtils:
 
             print(f"📥 Inserting {len(data_objects)} items...")
             response = self.collection.data.insert_many(data_objects)
+            bump_generation(self.collection.name)
 
             if response.has_errors:
                 print("❌ Insert Errors:", response.errors)
@@ -150,8 +442,12 @@ class WeaviateUtils:
                     print(f"{prop1}:", obj1.properties.get(prop1))
             print("===+==="*20)
  
-    def search_by_source(self, source_set=None, index_set=None, index_range=2, limit=5):
-        """Search objects by 'source' and index range (single query)."""
+    def search_by_source(self, source_set=None, index_set=None, index_range=2, limit=5, hits=None):
+        """
+        Search objects by 'source' and index range (single query).
+        :param hits: The hit objects behind source_set / index_set; with follow_links, hits stored with
+            neighbour links are expanded by ID lookups instead of the combined window query.
+        """
 
         source_set = source_set or []
         index_set = index_set or []
@@ -163,47 +459,41 @@ class WeaviateUtils:
             print("❌ No sources or indexes provided for search.")
             return
         contents = ""
-        for source, index in zip(source_set, index_set):
-            start_index = max(index - index_range, 0)
-            end_index = index + index_range
-
-            print(f"\n🔍 Searching for source: {source}, range: {start_index} → {end_index}")
-            filters = (
-                        Filter.by_property("source").equal(source)
-                        & Filter.by_property("chunk_index").greater_or_equal(start_index)
-                        & Filter.by_property("chunk_index").less_or_equal(end_index)
-                    )
-            # Always fetch the common fields
-            base_props = ["content", "source", "chunk_index"]
-
-            # Add optional fields only if they exist in the schema
-            optional_props = []
-            schema_props = [p.name for p in self.collection.config.get().properties]
-
-            if "image_urls" in schema_props:
-                optional_props.append("image_urls")
-            if "youtube_urls" in schema_props:
-                optional_props.append("youtube_urls")
-
-            response = self.collection.query.fetch_objects(
-                return_properties=base_props + optional_props,
-                filters=filters,
-                limit=limit,
-            )
-            print(f"Filter: source={source}, chunk_index in [{start_index}, {end_index}]")
-            print(f"Length of response objects: {len(response.objects)}")
-            if not response.objects:
-                print(f"⚠️ No chunks found for {source} in range {start_index} → {end_index}")
+        # Always fetch the common fields
+        base_props = ["content", "source", "chunk_index"]
+        # Add optional fields only if they exist in the schema
+        optional_props = [name for name in ("image_urls", "youtube_urls") if self.meta.has_property(name)]
+        # One combined query for every neighbour window instead of one query per source.
+        windows = merge_windows(zip(source_set, index_set), index_range)
+        # chunk_count is only set on objects ingested with neighbour links.
+        linked = [hit for hit in hits or [] if hit.properties.get("chunk_count")] if self.follow_links else []
+        linked_sources = {hit.properties["source"] for hit in linked}
+        unlinked = [(source, index) for source, index in zip(source_set, index_set) if source not in linked_sources]
+        chunks_by_source = {}
+        if linked:
+            chunks_by_source.update(self.context_expander.expand_by_links(
+                linked, index_range, base_props + optional_props, limit_per_source=limit
+            ))
+        if unlinked:
+            chunks_by_source.update(self.context_expander.expand(
+                unlinked, index_range, base_props + optional_props, limit_per_source=limit
+            ))
+        for source, spans in windows.items():
+            ranges = ", ".join(f"{start} → {end}" for start, end in spans)
+            objects = chunks_by_source.get(source, [])
+            print(f"\n🔍 Source: {source}, range: {ranges}")
+            if not objects:
+                print(f"⚠️ No chunks found for {source} in range {ranges}")
                 continue
 
-            print(f"Retrieved {len(response.objects)} chunks:")
-            for obj in sorted(response.objects, key=lambda x: x.properties["chunk_index"]):
+            print(f"Retrieved {len(objects)} chunks:")
+            for obj in objects:
                 print(f"  [{obj.properties['chunk_index']}] {obj.properties['content']}")
                 contents += f"{obj.properties['content']}\n"
             contents += "\n"
-            # contents += self.extract_sources(response.objects[0])
+            # contents += self.extract_sources(objects[0])
             score=.5
-            obj = response.objects[0]
+            obj = objects[0]
             source = obj.properties.get("source", "Unknown Product")
             if obj.properties.get("image_urls", None) or obj.properties.get("youtube_urls", None):
                 image_urls = (
@@ -244,33 +534,54 @@ class WeaviateUtils:
             results.append(contents)
             
         formatted_content = "\n\n" + ("\n" + "=" * 50 + "\n\n").join(results)
-        print({"content": formatted_content, "sources": sources_list})
+        result = {"content": formatted_content, "sources": sources_list}
+        print(result)
+        return result
         
 
 
-    def run_query_hybrid(self, query_text, limit=5,index_range=50):
-        """Execute a near_text query and print results."""
+    def run_query_hybrid(self, query_text, limit=5,index_range=50, alpha=0.7, filters=None):
+        """
+        Execute a hybrid query, expand the hits' context and print / return the result.
+        Results are cached per (collection, normalized query, alpha, limit, filters, index_range)
+        until the collection is written to by this process or the cache TTL passes.
+        """
         print(f"\n🔍 Querying for: {query_text}\n")
+        key = (self.collection.name, normalize_query(query_text), alpha, limit,
+               repr(filters) if filters is not None else None, index_range)
+        generation = collection_generation(self.collection.name)
+        cached = QUERY_CACHE.get(key, generation)
+        if cached is not None:
+            print(f"♻️ Cached result ({QUERY_CACHE.stats()})")
+            print(cached)
+            return cached
+        start = time.perf_counter()
+        link_props = list(LINK_PROPERTIES) if self.follow_links and self.links_enabled else []
         response = self.collection.query.hybrid(
             query=query_text,
             limit=limit,
-            alpha=0.7,
-            return_properties=["content", "source","chunk_index"],
+            alpha=alpha,
+            filters=filters,
+            return_properties=["content", "source","chunk_index"] + link_props,
             return_metadata=MetadataQuery(score=True),
             fusion_type = HybridFusion.RELATIVE_SCORE,
             auto_limit=2,
         )
-        source_set ,index_set= [],[]
+        source_set ,index_set, hits= [],[],[]
         for i, obj in enumerate(response.objects, start=1):
             if obj.properties.get("source") in source_set:
                 continue
             source_set.append(obj.properties.get("source"))
             index_set.append(obj.properties.get("chunk_index"))
+            hits.append(obj)
 
         print(" Related items ")
         print("* * * * *"*20)
-        self.search_by_source(source_set,index_set,index_range=index_range, limit=limit)
+        result = self.search_by_source(source_set,index_set,index_range=index_range, limit=limit, hits=hits)
         print("* * * * *"*20)
+        if result is not None:
+            QUERY_CACHE.put(key, generation, result, time.perf_counter() - start)
+        return result
 
     def delete_by_source(self, file_source: str):
         """Delete objects by 'source' property."""
@@ -285,6 +596,7 @@ class WeaviateUtils:
                 where=Filter.by_property("source").equal(file_source)
             )
             print(f"Deleted {result.matches} objects, failed {result.failed}")
+        bump_generation(self.collection.name)
 
     # def retrieve_by_field(self, field_list, limit=5,filters=None):
     #     """Retrieve data using a near_text query."""
@@ -319,6 +631,7 @@ class WeaviateUtils:
                 where=Filter.by_property("source").equal(file_source)
             )
             print(f"Deleted {result.matches} objects for source '{file_source}', failed {result.failed}")
+        bump_generation(self.collection.name)
 
     
     def print_collection_info(self):
@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+from weaviate.util import generate_uuid5
+
+from src.utils.vectorDB.batch_ingest import InsertResult
+from src.utils.vectorDB.chunk_diff import StoredChunk, content_hash, diff_chunks
+from src.utils.vectorDB.neighbour_links import LINK_PROPERTIES, chunk_properties
+from src.utils.vectorDB.weaviate_utils import WeaviateUtils, _stored_links
+
+SOURCE, LEVEL, ORIGIN = "manual.pdf", "public", "docling"
+
+
+class InMemoryCollection:
+    """Just enough of a Weaviate collection (plus WeaviateUtils hooks) to run inserts and syncs."""
+
+    name = "SyncTest"
+
+    def __init__(self):
+        self.objects = {}  # uuid -> {"properties": ..., "vector": ...}
+        self.data = SimpleNamespace(update=self.update)
+        names = ["content", "source", "level", "origin", "chunk_index", *LINK_PROPERTIES]
+        self.config = SimpleNamespace(get=lambda: SimpleNamespace(properties=[SimpleNamespace(name=n) for n in names]))
+
+    def update(self, uuid, properties):
+        self.objects[str(uuid)]["properties"].update(properties)
+
+    def ingest(self, rows):
+        result = InsertResult()
+        for properties, uuid, *vector in rows:
+            self.objects[str(uuid)] = {"properties": dict(properties), "vector": vector[0] if vector else "server"}
+            result.inserted += 1
+        return result
+
+    def stored_chunks(self, source):
+        return [
+            StoredChunk(uuid, content_hash(obj["properties"]["content"]), obj["properties"]["chunk_index"],
+                        obj["properties"]["level"], obj["properties"]["origin"], _stored_links(obj["properties"]))
+            for uuid, obj in self.objects.items() if obj["properties"]["source"] == source
+        ]
+
+
+def make_utils(collection):
+    utils = WeaviateUtils(collection, skip_existing=True)
+    utils.ingestor = SimpleNamespace(ingest=collection.ingest, max_retries=0)
+    utils.fetch_source_chunks = collection.stored_chunks
+    utils.existing_ids = lambda uuids: {str(u) for u in uuids if str(u) in collection.objects}
+    utils.fetch_vectors = lambda uuids: {u: collection.objects[u]["vector"] for u in uuids}
+
+    def delete_by_ids(uuids):
+        for uuid in uuids:
+            collection.objects.pop(uuid, None)
+        return len(uuids)
+
+    utils.delete_by_ids = delete_by_ids
+    return utils
+
+
+def full_insert(utils, contents):
+    return utils.insert_data(
+        content=contents,
+        source=[SOURCE] * len(contents),
+        level=[LEVEL] * len(contents),
+        origin=[ORIGIN] * len(contents),
+        chunk_index=list(range(len(contents))),
+    )
+
+
+def expected_uuid(text, index):
+    return str(generate_uuid5(chunk_properties(text, SOURCE, LEVEL, ORIGIN, index)))
+
+
+def test_incremental_then_full_leaves_no_duplicates():
+    collection = InMemoryCollection()
+    utils = make_utils(collection)
+    full_insert(utils, ["alpha", "beta", "gamma"])
+    old_vector = collection.objects[expected_uuid("beta", 1)]["vector"]
+
+    # A chunk inserted in front shifts every stored chunk_index.
+    new_contents = ["intro", "alpha", "beta", "gamma"]
+    summary = utils.sync_source(SOURCE, new_contents, list(range(4)), LEVEL, ORIGIN)
+    assert summary["inserted"] == 1 and summary["moved"] == 3 and summary["deleted"] == 0
+
+    # Every object sits under the UUID a full run derives, and keeps its stored vector.
+    assert set(collection.objects) == {expected_uuid(text, i) for i, text in enumerate(new_contents)}
+    assert collection.objects[expected_uuid("beta", 2)]["vector"] == old_vector
+
+    result = full_insert(utils, new_contents)
+    assert result.skipped == 4 and result.inserted == 0
+    assert len(collection.objects) == 4
+
+    # Neighbour links point at stored objects.
+    for obj in collection.objects.values():
+        for key in ("prev_id", "next_id"):
+            if obj["properties"][key]:
+                assert str(obj["properties"][key]) in collection.objects
+
+
+def test_diff_keeps_chunks_under_their_uuid():
+    stored = [
+        StoredChunk(expected_uuid(text, i), content_hash(text), i, LEVEL, ORIGIN)
+        for i, text in enumerate(["a", "b", "c"])
+    ]
+    diff = diff_chunks(stored, ["a", "c", "d"], [0, 1, 2], SOURCE, LEVEL, ORIGIN)
+    assert diff.unchanged == 1
+    assert diff.move == [(expected_uuid("c", 2), 1, "c")]
+    assert diff.insert == [(2, "d")]
+    assert diff.delete == [expected_uuid("b", 1)]
+    assert diff.kept == {0: expected_uuid("a", 0), 1: expected_uuid("c", 1), 2: expected_uuid("d", 2)}
+
+
+def test_diff_moves_chunks_whose_level_changed():
+    stored = [StoredChunk(expected_uuid("a", 0), content_hash("a"), 0, LEVEL, ORIGIN)]
+    diff = diff_chunks(stored, ["a"], [0], SOURCE, "internal", ORIGIN)
+    assert diff.unchanged == 0 and len(diff.move) == 1 and not diff.delete
+
+
+def test_diff_matches_duplicate_contents_one_to_one():
+    stored = [
+        StoredChunk(expected_uuid(text, i), content_hash(text), i, LEVEL, ORIGIN)
+        for i, text in enumerate(["same", "other", "same"])
+    ]
+    diff = diff_chunks(stored, ["same", "same", "same"], [0, 1, 2], SOURCE, LEVEL, ORIGIN)
+    # Both stored copies keep their UUIDs; the third copy is new and "other" goes.
+    assert diff.unchanged == 2
+    assert diff.move == [] and diff.insert == [(1, "same")]
+    assert diff.delete == [expected_uuid("other", 1)]
+    assert diff.summary() == {"inserted": 1, "deleted": 1, "moved": 0, "updated": 0, "unchanged": 2}
@@ -0,0 +1,88 @@
+import pytest
+
+from src.utils.chunker import FastTextChunker, TokenTextChunker, get_tokenizer
+
+JAPANESE = "規程の目的。この規程は経理の基準を定める。対象は全社とする！\n\n第二条、用語の定義？" * 6
+ENGLISH = "\n\n".join(
+    " ".join(f"word{p}_{w}" for w in range(40)) for p in range(8)
+)
+
+
+class WordTokenizer:
+    """Counts whitespace-separated words as tokens."""
+
+    def encode(self, text):
+        return text.split()
+
+
+def assert_offsets(text, chunks):
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        assert chunk.text == text[chunk.start:chunk.end]
+        assert chunk.text == chunk.text.strip()
+    # Chunks advance through the text and leave nothing but whitespace uncovered.
+    covered = 0
+    for chunk in chunks:
+        assert chunk.start >= 0 and chunk.end > chunk.start
+        assert not text[covered:chunk.start].strip()
+        covered = max(covered, chunk.end)
+    assert not text[covered:].strip()
+
+
+@pytest.mark.parametrize("text", [JAPANESE, ENGLISH])
+def test_fast_chunker_offsets_and_sizes(text):
+    chunker = FastTextChunker(chunk_size=60, chunk_overlap=10)
+    chunks = chunker.split_with_offsets(text)
+    assert len(chunks) > 1
+    assert_offsets(text, chunks)
+    assert all(len(chunk.text) <= 60 for chunk in chunks)
+
+
+def test_fast_chunker_overlap_is_bounded():
+    chunks = FastTextChunker(chunk_size=60, chunk_overlap=10).split_with_offsets(ENGLISH)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start >= previous.start
+        assert max(0, previous.end - chunk.start) <= 10
+
+
+def test_fast_chunker_keeps_sentence_end_with_its_sentence():
+    chunks = FastTextChunker(chunk_size=20, chunk_overlap=0).split_with_offsets("一つ目の文です。二つ目の文です。三つ目の文です。")
+    assert [chunk.text for chunk in chunks] == ["一つ目の文です。二つ目の文です。", "三つ目の文です。"]
+
+
+def test_fast_chunker_split_texts_restarts_indexes_per_document():
+    texts, indexes = FastTextChunker(chunk_size=60, chunk_overlap=10).split_texts([ENGLISH, "short"])
+    assert texts[-1] == "short"
+    assert indexes[-1] == 0 and indexes[0] == 0
+    assert indexes[:-1] == list(range(len(indexes) - 1))
+
+
+def test_fast_chunker_edge_cases():
+    chunker = FastTextChunker(chunk_size=10, chunk_overlap=2)
+    assert chunker.split_with_offsets("") == []
+    assert chunker.split_texts([]) == ([], [])
+    assert [c.text for c in chunker.split_with_offsets("  abc  ")] == ["abc"]
+    with pytest.raises(ValueError):
+        FastTextChunker(chunk_size=10, chunk_overlap=10)
+
+
+def test_token_chunker_measures_tokens():
+    chunker = TokenTextChunker(max_tokens=12, overlap_tokens=3, tokenizer=WordTokenizer())
+    chunks = chunker.split_with_offsets(ENGLISH)
+    assert_offsets(ENGLISH, chunks)
+    assert all(len(chunk.text.split()) <= 12 for chunk in chunks)
+    stats = chunker.token_stats()
+    assert stats["chunks"] == len(chunks) and stats["budget"] == 12
+    assert stats["over_budget"] == 0 and stats["max"] <= 12
+
+
+def test_token_chunker_with_tiktoken():
+    pytest.importorskip("tiktoken")
+    try:
+        tokenizer = get_tokenizer()
+    except Exception as e:  # the BPE file is downloaded on first use
+        pytest.skip(f"tiktoken encoding unavailable: {e}")
+    chunker = TokenTextChunker(max_tokens=32, overlap_tokens=4, tokenizer=tokenizer)
+    chunks = chunker.split_with_offsets(JAPANESE)
+    assert_offsets(JAPANESE, chunks)
+    assert all(chunker.count_tokens(chunk.text) <= 32 for chunk in chunks)
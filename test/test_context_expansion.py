@@ -0,0 +1,23 @@
+from src.utils.vectorDB.context_expansion import merge_windows
+
+
+def test_windows_are_clamped_at_zero():
+    assert merge_windows([("a.pdf", 1)], 3) == {"a.pdf": [(0, 4)]}
+
+
+def test_overlapping_and_touching_windows_merge():
+    hits = [("a.pdf", 10), ("a.pdf", 4), ("a.pdf", 15)]
+    # [2, 6] and [8, 12] are apart; [8, 12] and [13, 17] touch.
+    assert merge_windows(hits, 2) == {"a.pdf": [(2, 6), (8, 17)]}
+
+
+def test_sources_are_kept_apart_in_first_hit_order():
+    hits = [("b.pdf", 5), ("a.pdf", 5), ("b.pdf", 6)]
+    windows = merge_windows(hits, 1)
+    assert list(windows) == ["b.pdf", "a.pdf"]
+    assert windows == {"b.pdf": [(4, 7)], "a.pdf": [(4, 6)]}
+
+
+def test_zero_range_merges_duplicates_only():
+    assert merge_windows([("a.pdf", 3), ("a.pdf", 3), ("a.pdf", 5)], 0) == {"a.pdf": [(3, 3), (5, 5)]}
+    assert merge_windows([], 2) == {}
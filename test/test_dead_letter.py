@@ -0,0 +1,43 @@
+from src.utils.vectorDB.batch_ingest import FailedObject
+from src.utils.vectorDB.dead_letter import DeadLetterStore
+
+
+def make_store(tmp_path):
+    return DeadLetterStore(tmp_path / "dead_letter.sqlite3")
+
+
+def test_add_and_pending_round_trip(tmp_path):
+    store = make_store(tmp_path)
+    properties = {"content": "経理規程", "source": "a.pdf", "chunk_index": 3}
+    assert store.add("Docs", [FailedObject("u1", properties, "timeout")]) == 1
+    assert list(store.pending("Docs")) == [(properties, "u1")]
+    assert store.collections() == ["Docs"]
+    assert store.count() == 1 and store.count("Other") == 0
+
+
+def test_failing_again_bumps_attempts_and_keeps_one_row(tmp_path):
+    store = make_store(tmp_path)
+    store.add("Docs", [FailedObject("u1", {"content": "a"}, "timeout")])
+    store.add("Docs", [FailedObject("u1", {"content": "b"}, "rate limit")])
+    assert store.count("Docs") == 1
+    attempts, error, properties = store.conn.execute(
+        "SELECT attempts, error, properties FROM failed_objects WHERE uuid = 'u1'"
+    ).fetchone()
+    assert (attempts, error) == (2, "rate limit")
+    assert list(store.pending("Docs")) == [({"content": "b"}, "u1")]
+
+
+def test_remove_is_scoped_to_collection(tmp_path):
+    store = make_store(tmp_path)
+    store.add("Docs", [FailedObject("u1", {}, "e"), FailedObject("u2", {}, "e")])
+    store.add("Other", [FailedObject("u1", {}, "e")])
+    store.remove("Docs", ["u1"])
+    assert [uuid for _, uuid in store.pending("Docs")] == ["u2"]
+    assert store.count("Other") == 1
+
+
+def test_store_persists_across_connections(tmp_path):
+    store = make_store(tmp_path)
+    store.add("Docs", [FailedObject("u1", {"content": "a"}, "e")])
+    store.close()
+    assert make_store(tmp_path).count("Docs") == 1
@@ -0,0 +1,73 @@
+import os
+
+from src.utils.ingest_manifest import DONE, FAILED, IngestManifest
+
+COLLECTION = "Docs"
+
+
+def make_manifest(tmp_path):
+    return IngestManifest(tmp_path / "manifest.sqlite3")
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_new_files_are_changed_until_done(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a, b = write(tmp_path / "a.md", "alpha"), write(tmp_path / "b.md", "beta")
+    assert manifest.filter_changed([a, b], COLLECTION) == [a, b]
+    manifest.mark_started([a, b], COLLECTION)
+    manifest.mark_done(a, COLLECTION, chunk_count=2)
+    assert manifest.filter_changed([a, b], COLLECTION) == [b]
+    # Done for one collection says nothing about another.
+    assert manifest.filter_changed([a], "Other") == [a]
+
+
+def test_content_change_is_detected(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write(tmp_path / "a.md", "alpha")
+    manifest.mark_done(a, COLLECTION, chunk_count=1)
+    write(a, "alpha, revised")
+    assert not manifest.is_unchanged(a, COLLECTION)
+
+
+def test_touched_file_with_same_content_is_unchanged(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write(tmp_path / "a.md", "alpha")
+    manifest.mark_done(a, COLLECTION, chunk_count=1)
+    stat = os.stat(a)
+    os.utime(a, (stat.st_atime, stat.st_mtime + 100))
+    assert manifest.is_unchanged(a, COLLECTION)
+    # The new mtime is stored, so the next check needs no hash.
+    assert manifest._row(a, COLLECTION)[1] == stat.st_mtime + 100
+
+
+def test_failed_files_are_retried(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write(tmp_path / "a.md", "alpha")
+    manifest.mark_done(a, COLLECTION, chunk_count=1)
+    manifest.mark_failed([(a, "insert failed")], COLLECTION)
+    assert manifest.filter_changed([a], COLLECTION) == [a]
+    assert manifest.summary(COLLECTION) == {FAILED: {"files": 1, "chunks": 1}}
+
+
+def test_deleted_files_are_skipped(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write(tmp_path / "a.md", "alpha")
+    manifest.mark_done(a, COLLECTION, chunk_count=1)
+    a.unlink()
+    assert manifest.filter_changed([a], COLLECTION) == []
+
+
+def test_import_processed_log_and_forget_collection(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a, b = write(tmp_path / "a.md", "alpha"), write(tmp_path / "b.md", "beta")
+    log = write(tmp_path / "processed_files.txt", f"{a}\n{a}\n{tmp_path / 'gone.md'}\n")
+    assert manifest.import_processed_log(log, COLLECTION) == 1
+    assert manifest.import_processed_log(log, COLLECTION) == 0
+    assert manifest.summary(COLLECTION) == {DONE: {"files": 1, "chunks": 0}}
+    assert manifest.filter_changed([str(a), b], COLLECTION) == [b]
+    assert manifest.forget_collection(COLLECTION) == 1
+    assert manifest.filter_changed([str(a)], COLLECTION) == [str(a)]
@@ -0,0 +1,55 @@
+from src.utils.vectorDB import query_cache
+from src.utils.vectorDB.query_cache import QueryResultCache, bump_generation, collection_generation, normalize_query
+
+
+def test_hit_miss_and_stats():
+    cache = QueryResultCache()
+    assert cache.get("q", 0) is None
+    cache.put("q", 0, ["result"], seconds=0.5)
+    assert cache.get("q", 0) == ["result"]
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_ratio": 0.5, "seconds_saved": 0.5}
+
+
+def test_generation_change_invalidates():
+    name = "QueryCacheTest"
+    cache = QueryResultCache()
+    cache.put("q", collection_generation(name), "old", seconds=0.1)
+    bump_generation(name)
+    assert cache.get("q", collection_generation(name)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryResultCache(ttl=60.0)
+    cache.put("q", 0, "value", seconds=0.1)
+    now[0] += 59
+    assert cache.get("q", 0) == "value"
+    now[0] += 1
+    assert cache.get("q", 0) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryResultCache(max_entries=2)
+    cache.put("a", 0, 1, seconds=0)
+    cache.put("b", 0, 2, seconds=0)
+    cache.get("a", 0)
+    cache.put("c", 0, 3, seconds=0)
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == 1 and cache.get("c", 0) == 3
+
+
+def test_values_are_copied_in_and_out():
+    cache = QueryResultCache()
+    value = [{"content": "a"}]
+    cache.put("q", 0, value, seconds=0)
+    value.append({"content": "changed by caller"})
+    served = cache.get("q", 0)
+    served[0]["content"] = "modified"
+    assert cache.get("q", 0) == [{"content": "a"}]
+
+
+def test_normalize_query():
+    assert normalize_query("  Tell me   about Lasers? ") == "tell me about lasers"
+    assert normalize_query(None) == ""